@@ -1,16 +1,39 @@
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_cache import get_default_cache
+from posts_stream import even_user_id, stream_posts
+
+BASE_URL = "https://jsonplaceholder.typicode.com"
 
 # 1. GET-запрос: Запросить список постов и вывести те, которые принадлежат пользователям с чётным ID.
-def get_even_user_posts():
+# При stream=True тело ответа разбирается по кускам, и в памяти не держится весь массив;
+# predicate задаёт фильтр (по умолчанию - чётный userId).
+# Без stream ответ берётся через общий HTTP-кэш с условной перепроверкой.
+def get_even_user_posts(stream=False, predicate=even_user_id):
     url = "https://jsonplaceholder.typicode.com/posts"
-    response = requests.get(url)
+    if stream:
+        response = requests.get(url, stream=True)
+    else:
+        response = get_default_cache().get(url)
     
     if response.status_code == 200:
-        posts = response.json()
+        if stream:
+            posts = stream_posts(response, predicate)
+        else:
+            posts = (post for post in response.json() if predicate(post))
         print("Посты пользователей с чётными ID:")
         for post in posts:
-            if post['userId'] % 2 == 0:
-                print(post)
+            print(post)
     else:
         print(f"Ошибка при выполнении GET-запроса: {response.status_code}")
 
@@ -50,9 +73,183 @@ def update_post(post_id):
     else:
         print(f"Ошибка при обновлении поста: {response.status_code}")
 
-def main():
+# Клиент API постов: общий пул keep-alive соединений, повторы с backoff на 429/5xx
+# и пакетные операции с ограниченным числом одновременных запросов.
+class PostsClient:
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, base_url=BASE_URL, max_workers=16, retries=3, backoff_factor=0.3, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.timeout = timeout
+
+        # POST не идемпотентен: после 5xx или обрыва чтения пост мог уже создаться,
+        # поэтому он повторяется только при ошибке соединения (запрос не был отправлен)
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "PUT", "DELETE"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        # pool_maxsize равен числу потоков, чтобы каждый поток держал своё keep-alive соединение
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, pool_block=True, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_posts(self):
+        response = self.session.get(f"{self.base_url}/posts", timeout=self.timeout)
+        if response.status_code == 200:
+            return response.json()
+        print(f"Ошибка при выполнении GET-запроса: {response.status_code}")
+        return None
+
+    def create_post(self, post):
+        response = self.session.post(f"{self.base_url}/posts", json=post, timeout=self.timeout)
+        if response.status_code == 201:
+            return response.json()
+        print(f"Ошибка при создании поста: {response.status_code}")
+        return None
+
+    def update_post(self, post_id, post):
+        response = self.session.put(f"{self.base_url}/posts/{post_id}", json=post, timeout=self.timeout)
+        if response.status_code == 200:
+            return response.json()
+        print(f"Ошибка при обновлении поста {post_id}: {response.status_code}")
+        return None
+
+    # Создание множества постов; результаты возвращаются в порядке входных данных
+    def create_posts(self, posts):
+        return self._fan_out(self.create_post, posts)
+
+    # Обновление постов по словарю {post_id: post}; возвращает {post_id: результат}
+    def update_posts(self, updates):
+        items = list(updates.items())
+        results = self._fan_out(lambda item: self.update_post(*item), items)
+        return {post_id: result for (post_id, _), result in zip(items, results)}
+
+    # Параллельный запуск с окном не больше 2 * max_workers задач, чтобы не держать
+    # в памяти фьючерсы для всего (возможно, ленивого) входного итератора
+    def _fan_out(self, func, items):
+        results = []
+        window = self.max_workers * 2
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = deque()
+            for item in items:
+                pending.append(executor.submit(func, item))
+                if len(pending) >= window:
+                    results.append(pending.popleft().result())
+            while pending:
+                results.append(pending.popleft().result())
+        return results
+
+
+# Локальный заменитель jsonplaceholder для бенчмарка: HTTP/1.1 с keep-alive
+# и искусственной задержкой, имитирующей сетевую
+class StubPostsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    latency = 0.002
+    posts = [{"userId": i % 10 + 1, "id": i, "title": f"title {i}", "body": f"body {i}"} for i in range(1, 101)]
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        time.sleep(self.latency)
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/posts":
+            self._send_json(404, {})
+            return
+        etag = f'"{len(self.posts)}"'
+        if self.headers.get("If-None-Match") == etag:
+            time.sleep(self.latency)
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._send_json(200, self.posts, {"ETag": etag})
+
+    def do_POST(self):
+        post = self._read_json()
+        post["id"] = len(self.posts) + 1
+        self._send_json(201, post)
+
+    def do_PUT(self):
+        post = self._read_json()
+        post["id"] = int(self.path.rsplit("/", 1)[-1])
+        self._send_json(200, post)
+
+
+def start_stub_server(latency=0.002):
+    StubPostsHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubPostsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+# Бенчмарк: запросы в секунду для текущего подхода (голый requests.post/put по одному)
+# и для PostsClient с пулом соединений и параллельной отправкой
+def benchmark(count=1000, workers=16, latency=0.002):
+    server, base_url = start_stub_server(latency)
+    new_posts = [{"title": f"Пост {i}", "body": "Тело", "userId": 1} for i in range(count)]
+    updates = {i + 1: post for i, post in enumerate(new_posts)}
+
+    def report(name, started, total):
+        elapsed = time.perf_counter() - started
+        print(f"{name:<40} {total / elapsed:10.1f} req/s ({elapsed:.2f} s)")
+
+    try:
+        started = time.perf_counter()
+        for post in new_posts:
+            requests.post(f"{base_url}/posts", json=post)
+        for post_id, post in updates.items():
+            requests.put(f"{base_url}/posts/{post_id}", json=post)
+        report("Последовательно, без пула", started, 2 * count)
+
+        with PostsClient(base_url, max_workers=1) as client:
+            started = time.perf_counter()
+            client.create_posts(new_posts)
+            client.update_posts(updates)
+            report("PostsClient, 1 поток (keep-alive)", started, 2 * count)
+
+        with PostsClient(base_url, max_workers=workers) as client:
+            started = time.perf_counter()
+            client.create_posts(new_posts)
+            client.update_posts(updates)
+            report(f"PostsClient, {workers} потоков", started, 2 * count)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def main(stream=False):
     # Выполнение GET-запроса
-    get_even_user_posts()
+    get_even_user_posts(stream)
     
     # Выполнение POST-запроса и получение ID нового поста
     new_post = create_post()
@@ -63,4 +260,15 @@ def main():
         update_post(post_id)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stream", action="store_true", help="потоковый разбор ответа GET /posts")
+    parser.add_argument("--bench", action="store_true", help="сравнить PostsClient с последовательными запросами")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.002, help="задержка заглушки сервера, с")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.count, args.workers, args.latency)
+    else:
+        main(args.stream)
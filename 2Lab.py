@@ -1,5 +1,89 @@
+import os
+import sys
+import time
 import socket
+import struct
+import asyncio
+import tempfile
+import argparse
+import selectors
 import threading
+import multiprocessing
+
+# Кадрирование сообщений: 8-байтовая длина (network byte order) и тело
+FRAME_HEADER = struct.Struct('!Q')
+# Наибольшая принимаемая длина кадра: длина приходит от собеседника, и без предела
+# один заголовок заставил бы выделить буфер любого размера
+MAX_FRAME = 256 * 1024 * 1024
+
+
+class FrameTooLarge(ConnectionError):
+    pass
+
+
+# Чтение ровно len(view) байт прямо в переданный буфер, без промежуточных копий
+def recv_exact_into(sock, view):
+    received = 0
+    while received < len(view):
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("Соединение закрыто посреди сообщения")
+        received += count
+
+
+# Отправка кадра: заголовок и тело уходят одним sendmsg (scatter-gather),
+# тело передаётся как memoryview и не копируется
+def send_frame(sock, payload):
+    payload = memoryview(payload).cast('B')
+    header = FRAME_HEADER.pack(len(payload))
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(header)
+        sock.sendall(payload)
+        return
+    buffers = [memoryview(header), payload]
+    while buffers:
+        sent = sock.sendmsg(buffers)
+        while buffers and sent >= len(buffers[0]):
+            sent -= len(buffers[0])
+            buffers.pop(0)
+        if buffers and sent:
+            buffers[0] = buffers[0][sent:]
+
+
+# Отправка файла как кадра: тело идёт через socket.sendfile (в ядре, без копирования
+# в пространство пользователя там, где ОС это поддерживает)
+def send_file_frame(sock, file):
+    size = os.fstat(file.fileno()).st_size
+    sock.sendall(FRAME_HEADER.pack(size))
+    file.seek(0)
+    sock.sendfile(file, 0, size)
+
+
+# Приёмник кадров с переиспользуемым буфером: буфер растёт до размера самого
+# большого сообщения и дальше не перевыделяется. Возвращаемый memoryview
+# действителен до следующего вызова recv_frame. Кадр длиннее max_frame закрывает
+# соединение (FrameTooLarge): его тело всё равно не дочитать до следующего заголовка.
+class FrameReader:
+    def __init__(self, sock, initial_size=64 * 1024, max_frame=MAX_FRAME):
+        self.sock = sock
+        self.max_frame = max_frame
+        self._header = bytearray(FRAME_HEADER.size)
+        self._buffer = bytearray(initial_size)
+        self._view = memoryview(self._buffer)
+
+    def recv_frame(self):
+        recv_exact_into(self.sock, memoryview(self._header))
+        (length,) = FRAME_HEADER.unpack(self._header)
+        if length > self.max_frame:
+            self.sock.close()
+            raise FrameTooLarge(f"Кадр {length} байт больше предела {self.max_frame}")
+        if length > len(self._buffer):
+            self._view.release()
+            self._buffer = bytearray(min(max(length, 2 * len(self._buffer)), self.max_frame))
+            self._view = memoryview(self._buffer)
+        view = self._view[:length]
+        recv_exact_into(self.sock, view)
+        return view
 
 # TCP-сервер (Echo-сервер)
 def tcp_server():
@@ -11,23 +95,240 @@ def tcp_server():
     conn, addr = server_socket.accept()
     print(f"Подключен клиент: {addr}")
 
-    data = conn.recv(1024)
-    print(f"Получено сообщение: {data.decode()}")
-    conn.sendall(data)
+    data = FrameReader(conn).recv_frame()
+    print(f"Получено сообщение: {str(data, 'utf-8')}")
+    send_frame(conn, data)
 
     conn.close()
     server_socket.close()
 
+# Состояние одного клиента многопользовательского echo-сервера
+class EchoConnection:
+    __slots__ = ("sock", "addr", "read_buffer", "out", "last_active", "events", "eof")
+
+    def __init__(self, sock, addr, buffer_size):
+        self.sock = sock
+        self.addr = addr
+        self.read_buffer = memoryview(bytearray(buffer_size))
+        self.out = bytearray()
+        self.last_active = time.monotonic()
+        self.events = selectors.EVENT_READ
+        self.eof = False  # Клиент закрыл передачу; соединение закрывается, когда эхо дописано
+
+
+# Пауза перед повторным приёмом соединений после ошибки accept (секунды)
+ACCEPT_RETRY_DELAY = 0.5
+
+
+# Многопользовательский TCP echo-сервер на selectors: неблокирующие сокеты,
+# собственный буфер чтения у каждого соединения, эхо всего потока (а не одного recv),
+# тайм-аут простоя, ограничение числа соединений и корректное завершение.
+class EchoServer:
+    def __init__(self, host='localhost', port=12345, backlog=1024, buffer_size=64 * 1024,
+                 idle_timeout=60.0, max_connections=10000, report_interval=None):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.buffer_size = buffer_size
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.report_interval = report_interval
+        # Пока неотправленный хвост больше лимита, соединение не читается (backpressure)
+        self.max_pending = 4 * buffer_size
+        self.connections = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.accepted = 0
+        self.timed_out = 0
+        self.rejected = 0
+        self._selector = selectors.DefaultSelector()
+        self._running = False
+        self._accepting = False
+        self._accept_resume_at = None  # После ошибки accept приём возобновляется не сразу
+        self._wakeup_r, self._wakeup_w = socket.socketpair()
+        self._wakeup_r.setblocking(False)
+        self._wakeup_w.setblocking(False)
+
+        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server_socket.bind((host, port))
+        self.server_socket.listen(backlog)
+        self.server_socket.setblocking(False)
+        self.port = self.server_socket.getsockname()[1]
+
+    def stats(self):
+        return {
+            "connections": len(self.connections),
+            "accepted": self.accepted,
+            "timed_out": self.timed_out,
+            "rejected": self.rejected,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+    def serve_forever(self):
+        self._running = True
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+        self._set_accepting(True)
+        last_check = last_report = time.monotonic()
+        last_bytes = 0
+        tick = 1.0 if self.idle_timeout is None else min(1.0, self.idle_timeout / 2)
+
+        try:
+            while self._running:
+                for key, mask in self._selector.select(timeout=tick):
+                    if key.fileobj is self._wakeup_r:
+                        self._drain_wakeup()
+                    elif key.fileobj is self.server_socket:
+                        self._accept()
+                    else:
+                        conn = key.data
+                        if mask & selectors.EVENT_READ:
+                            self._read(conn)
+                        if mask & selectors.EVENT_WRITE and conn.sock.fileno() != -1:
+                            self._write(conn)
+
+                now = time.monotonic()
+                if self._accept_resume_at is not None and now >= self._accept_resume_at:
+                    self._accept_resume_at = None
+                    if len(self.connections) < self.max_connections:
+                        self._set_accepting(True)
+                if self.idle_timeout is not None and now - last_check >= tick:
+                    self._close_idle(now)
+                    last_check = now
+                if self.report_interval and now - last_report >= self.report_interval:
+                    total = self.bytes_in + self.bytes_out
+                    rate = (total - last_bytes) / (now - last_report)
+                    print(f"Соединений: {len(self.connections)}, "
+                          f"пропускная способность: {rate / 1e6:.2f} МБ/с")
+                    last_report, last_bytes = now, total
+        finally:
+            self._close_all()
+
+    # Остановка из любого потока: цикл просыпается через socketpair
+    def shutdown(self):
+        self._running = False
+        try:
+            self._wakeup_w.send(b'\0')
+        except OSError:
+            pass
+
+    def _drain_wakeup(self):
+        try:
+            while self._wakeup_r.recv(1024):
+                pass
+        except BlockingIOError:
+            pass
+
+    # При достижении лимита соединений сервер перестаёт принимать новые,
+    # и они ждут в очереди backlog
+    def _set_accepting(self, accepting):
+        if accepting and not self._accepting:
+            self._selector.register(self.server_socket, selectors.EVENT_READ)
+        elif not accepting and self._accepting:
+            self._selector.unregister(self.server_socket)
+        self._accepting = accepting
+
+    def _accept(self):
+        while len(self.connections) < self.max_connections:
+            try:
+                sock, addr = self.server_socket.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # Например, EMFILE: лимит дескрипторов процесса. Слушающий сокет остаётся
+                # готовым к чтению, поэтому снимается с наблюдения до следующего тика
+                # (или до закрытия какого-нибудь соединения), иначе цикл крутится вхолостую
+                self.rejected += 1
+                self._set_accepting(False)
+                self._accept_resume_at = time.monotonic() + ACCEPT_RETRY_DELAY
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = EchoConnection(sock, addr, self.buffer_size)
+            self.connections[sock.fileno()] = conn
+            self._selector.register(sock, selectors.EVENT_READ, conn)
+            self.accepted += 1
+        self._set_accepting(False)
+
+    def _read(self, conn):
+        try:
+            received = conn.sock.recv_into(conn.read_buffer)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(conn)
+            return
+        if not received:
+            # Клиент закрыл свою сторону (SHUT_WR): читать больше нечего, но
+            # неотправленное эхо дописывается, и только потом соединение закрывается
+            conn.eof = True
+            self._write(conn)
+            return
+        self.bytes_in += received
+        conn.last_active = time.monotonic()
+        conn.out += conn.read_buffer[:received]
+        self._write(conn)
+
+    def _write(self, conn):
+        if conn.out:
+            try:
+                sent = conn.sock.send(conn.out)
+            except (BlockingIOError, InterruptedError):
+                sent = 0
+            except OSError:
+                self._close(conn)
+                return
+            if sent:
+                del conn.out[:sent]
+                self.bytes_out += sent
+                conn.last_active = time.monotonic()
+        if conn.eof and not conn.out:
+            self._close(conn)
+            return
+
+        events = selectors.EVENT_WRITE if conn.out else 0
+        if not conn.eof and len(conn.out) < self.max_pending:
+            events |= selectors.EVENT_READ
+        if events != conn.events:
+            self._selector.modify(conn.sock, events, conn)
+            conn.events = events
+
+    def _close_idle(self, now):
+        for conn in list(self.connections.values()):
+            if now - conn.last_active > self.idle_timeout:
+                self.timed_out += 1
+                self._close(conn)
+
+    def _close(self, conn):
+        fileno = conn.sock.fileno()
+        if fileno == -1:
+            return
+        self._selector.unregister(conn.sock)
+        del self.connections[fileno]
+        conn.sock.close()
+        if self._running and not self._accepting:
+            self._set_accepting(True)
+
+    def _close_all(self):
+        for conn in list(self.connections.values()):
+            self._close(conn)
+        self._set_accepting(False)
+        self._selector.close()
+        self.server_socket.close()
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
 # TCP-клиент
 def tcp_client():
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     client_socket.connect(('localhost', 12345))
 
     message = "Hello, TCP Server!"
-    client_socket.sendall(message.encode())
+    send_frame(client_socket, message.encode())
 
-    data = client_socket.recv(1024)
-    print(f"Получен ответ от сервера: {data.decode()}")
+    data = FrameReader(client_socket).recv_frame()
+    print(f"Получен ответ от сервера: {str(data, 'utf-8')}")
 
     client_socket.close()
 
@@ -43,6 +344,129 @@ def udp_server():
 
     server_socket.close()
 
+# Обработчик пачки датаграмм по умолчанию: эхо каждой обратно отправителю.
+# Буферы пачки переиспользуются, поэтому сохранять memoryview после возврата нельзя.
+def echo_batch(sock, batch):
+    for data, addr in batch:
+        sock.sendto(data, addr)
+
+
+# Счётчик потерь датаграмм из-за переполнения буфера сокета (Linux: /proc/net/udp)
+def udp_socket_drops(sock):
+    inode = str(os.fstat(sock.fileno()).st_ino)
+    for table in ('/proc/net/udp', '/proc/net/udp6'):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[9] == inode:
+                        return int(fields[-1])
+        except OSError:
+            continue
+    return None
+
+
+def open_udp_socket(host, port, rcvbuf=None, reuse_port=False):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    if reuse_port:
+        if not hasattr(socket, 'SO_REUSEPORT'):
+            raise RuntimeError("SO_REUSEPORT не поддерживается этой ОС")
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    if rcvbuf:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+    sock.bind((host, port))
+    return sock
+
+
+# Цикл одного воркера: блокирующее ожидание первой датаграммы, затем
+# неблокирующий добор до batch_size в заранее выделенные буферы и передача
+# всей пачки обработчику
+def udp_worker(worker_id, host, port, handler=echo_batch, batch_size=64, datagram_size=2048,
+               rcvbuf=None, report_interval=5.0, stop_event=None, stats_queue=None):
+    sock = open_udp_socket(host, port, rcvbuf, reuse_port=True)
+    sock.settimeout(0.5)
+    buffers = [memoryview(bytearray(datagram_size)) for _ in range(batch_size)]
+    packets = total_packets = 0
+    last_report = time.monotonic()
+
+    try:
+        while stop_event is None or not stop_event.is_set():
+            batch = []
+            try:
+                count, addr = sock.recvfrom_into(buffers[0])
+                batch.append((buffers[0][:count], addr))
+                sock.setblocking(False)
+                while len(batch) < batch_size:
+                    buffer = buffers[len(batch)]
+                    count, addr = sock.recvfrom_into(buffer)
+                    batch.append((buffer[:count], addr))
+            except (BlockingIOError, socket.timeout):
+                pass
+            finally:
+                sock.settimeout(0.5)
+
+            if batch:
+                handler(sock, batch)
+                packets += len(batch)
+
+            now = time.monotonic()
+            if report_interval and now - last_report >= report_interval:
+                total_packets += packets
+                stats = {
+                    "worker": worker_id,
+                    "packets_per_sec": packets / (now - last_report),
+                    "packets": total_packets,
+                    "drops": udp_socket_drops(sock),
+                    "rcvbuf": sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF),
+                }
+                if stats_queue is not None:
+                    stats_queue.put(stats)
+                else:
+                    print(f"UDP-воркер {worker_id}: {stats['packets_per_sec']:.0f} пакетов/с, "
+                          f"потери: {stats['drops']}, SO_RCVBUF: {stats['rcvbuf']}")
+                packets = 0
+                last_report = now
+    finally:
+        sock.close()
+
+
+# UDP-приём в нескольких процессах на одном порту: каждый воркер открывает
+# свой сокет с SO_REUSEPORT, и ядро распределяет датаграммы между ними
+class UdpIngestServer:
+    def __init__(self, host='localhost', port=12346, workers=None, handler=echo_batch,
+                 batch_size=64, datagram_size=2048, rcvbuf=4 * 1024 * 1024, report_interval=5.0,
+                 stats_queue=None):
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.handler = handler
+        self.batch_size = batch_size
+        self.datagram_size = datagram_size
+        self.rcvbuf = rcvbuf
+        self.report_interval = report_interval
+        self.stats_queue = stats_queue
+        self._stop_event = multiprocessing.Event()
+        self._processes = []
+
+    def start(self):
+        for worker_id in range(self.workers):
+            process = multiprocessing.Process(
+                target=udp_worker,
+                args=(worker_id, self.host, self.port, self.handler, self.batch_size,
+                      self.datagram_size, self.rcvbuf, self.report_interval,
+                      self._stop_event, self.stats_queue),
+                daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+    def stop(self):
+        self._stop_event.set()
+        for process in self._processes:
+            process.join()
+        self._processes = []
+
 # UDP-клиент
 def udp_client():
     client_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -55,6 +479,287 @@ def udp_client():
 
     client_socket.close()
 
+# Эхо кадров в отдельном потоке для замера пропускной способности
+def framed_echo_server(server_socket):
+    conn, _ = server_socket.accept()
+    conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    reader = FrameReader(conn)
+    try:
+        while True:
+            send_frame(conn, reader.recv_frame())
+    except ConnectionError:
+        pass
+    finally:
+        conn.close()
+        server_socket.close()
+
+
+# Тест пропускной способности кадрированного TCP-пути для сообщений от 64 Б до 64 МБ:
+# обычная отправка из memoryview и отправка через sendfile из временного файла
+def framing_benchmark(sizes=None, volume=256 * 1024 * 1024):
+    sizes = sizes or [64, 1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024, 64 * 1024 * 1024]
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_socket.bind(('localhost', 0))
+    server_socket.listen(1)
+    server_thread = threading.Thread(target=framed_echo_server, args=(server_socket,), daemon=True)
+    server_thread.start()
+
+    client_socket = socket.create_connection(server_socket.getsockname())
+    client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    reader = FrameReader(client_socket)
+    print(f"{'Размер':>10} {'Сообщений':>10} {'сообщ./с':>12} {'МБ/с':>10} {'sendfile МБ/с':>14}")
+
+    try:
+        for size in sizes:
+            payload = memoryview(bytearray(size))
+            count = max(3, min(20000, volume // size))
+
+            started = time.perf_counter()
+            for _ in range(count):
+                send_frame(client_socket, payload)
+                if len(reader.recv_frame()) != size:
+                    raise ConnectionError("Эхо вернуло сообщение другой длины")
+            elapsed = time.perf_counter() - started
+
+            sendfile_rate = ""
+            if size >= 1024 * 1024:
+                with tempfile.TemporaryFile() as file:
+                    file.write(payload)
+                    file.flush()
+                    started = time.perf_counter()
+                    for _ in range(count):
+                        send_file_frame(client_socket, file)
+                        reader.recv_frame()
+                    sendfile_rate = f"{size * count / (time.perf_counter() - started) / 1e6:.1f}"
+
+            print(f"{size:>10} {count:>10} {count / elapsed:>12.1f} "
+                  f"{size * count / elapsed / 1e6:>10.1f} {sendfile_rate:>14}")
+    finally:
+        client_socket.close()
+        server_thread.join()
+
+# Тело тестового сообщения: запланированное время отправки (perf_counter), номер
+# сообщения у отправителя и дополнение до нужного размера
+LOAD_STAMP = struct.Struct('!dQ')
+
+
+def make_load_message(size, scheduled_at, sequence):
+    body = bytearray(max(size, LOAD_STAMP.size))
+    LOAD_STAMP.pack_into(body, 0, scheduled_at, sequence)
+    return body
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# Результаты нагрузочного прогона: число отправленных/полученных сообщений и задержки
+class LoadStats:
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.errors = 0
+        self.latencies = []
+
+    # Задержка считается от запланированного времени отправки, а не от фактического:
+    # если отправитель отстал от расписания, ожидание в очереди входит в задержку
+    # (иначе перцентили скрывают его - coordinated omission). Возвращает номер сообщения.
+    def record(self, body):
+        scheduled_at, sequence = LOAD_STAMP.unpack_from(body)
+        self.latencies.append(time.perf_counter() - scheduled_at)
+        self.received += 1
+        return sequence
+
+    @property
+    def lost(self):
+        return max(self.sent - self.received, 0)
+
+    # Прогон как проверка (CI): описание нарушенного порога или None, если всё в пределах.
+    # max_loss - допустимая доля потерянных сообщений
+    def failure(self, max_errors=0, max_loss=0.0):
+        if self.errors > max_errors:
+            return f"ошибок {self.errors} при допустимых {max_errors}"
+        if self.lost > max_loss * self.sent:
+            return f"потеряно {self.lost} из {self.sent} при допустимой доле {max_loss}"
+        return None
+
+    def report(self, title, elapsed):
+        latencies = sorted(self.latencies)
+        ms = [percentile(latencies, p) * 1000 for p in (0.50, 0.95, 0.99)]
+        print(f"{title}: отправлено {self.sent}, получено {self.received}, "
+              f"потеряно {self.lost}, ошибок {self.errors}")
+        print(f"  пропускная способность: {self.received / elapsed:.1f} сообщ./с")
+        print(f"  задержка, мс: p50 {ms[0]:.3f}  p95 {ms[1]:.3f}  p99 {ms[2]:.3f}  "
+              f"max {(latencies[-1] * 1000 if latencies else 0.0):.3f}")
+
+
+# Расписание отправки для одного соединения: при rate отправки идут с равным шагом,
+# иначе - без пауз. Возвращает время, от которого считается задержка этого сообщения
+# (по расписанию или текущее), и время следующей отправки. Отставший отправитель
+# шлёт без пауз, пока не догонит расписание; само расписание не сдвигается.
+async def _pace(next_send, interval):
+    if interval:
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return next_send, next_send + interval
+    await asyncio.sleep(0)
+    return time.perf_counter(), next_send
+
+
+# Одно TCP-соединение нагрузки: кадры как у tcp_client; в закрытом цикле следующее
+# сообщение уходит после ответа на предыдущее, в открытом - строго по расписанию
+async def _tcp_load_connection(host, port, stats, size, interval, deadline, open_loop):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        stats.errors += 1
+        return
+    writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    header = bytearray(FRAME_HEADER.size)
+    outstanding = 0
+    sending_done = False
+
+    async def receive_one():
+        nonlocal outstanding
+        header[:] = await reader.readexactly(FRAME_HEADER.size)
+        (length,) = FRAME_HEADER.unpack(header)
+        stats.record(await reader.readexactly(length))
+        outstanding -= 1
+
+    async def receive_loop():
+        while not sending_done or outstanding:
+            await receive_one()
+
+    try:
+        receiver = asyncio.ensure_future(receive_loop()) if open_loop else None
+        next_send = time.perf_counter()
+        sequence = 0
+        while time.perf_counter() < deadline:
+            scheduled_at, next_send = await _pace(next_send, interval)
+            sequence += 1
+            body = make_load_message(size, scheduled_at, sequence)
+            writer.write(FRAME_HEADER.pack(len(body)) + body)
+            stats.sent += 1
+            outstanding += 1
+            if open_loop:
+                await writer.drain()
+            else:
+                await receive_one()
+        sending_done = True
+        if receiver is not None:
+            if outstanding:
+                await asyncio.wait_for(receiver, timeout=5.0)
+            else:
+                receiver.cancel()
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+        stats.errors += 1
+    finally:
+        writer.close()
+
+
+# Ответ завершает ожидание, только если это ответ на ожидаемое сообщение: опоздавший
+# ответ на сообщение, по которому уже истёк тайм-аут, учитывается в задержках, но не
+# засчитывается следующему
+class _UdpLoadProtocol(asyncio.DatagramProtocol):
+    def __init__(self, stats):
+        self.stats = stats
+        self.reply = None
+        self.expected = None
+
+    def datagram_received(self, data, addr):
+        sequence = self.stats.record(data)
+        if sequence == self.expected and self.reply is not None and not self.reply.done():
+            self.reply.set_result(None)
+
+    def error_received(self, exc):
+        self.stats.errors += 1
+
+
+# Один UDP-отправитель нагрузки; в закрытом цикле ответ ждётся не дольше timeout,
+# после чего сообщение считается потерянным
+async def _udp_load_sender(host, port, stats, size, interval, deadline, open_loop, timeout=1.0):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(
+        lambda: _UdpLoadProtocol(stats), remote_addr=(host, port))
+    try:
+        next_send = time.perf_counter()
+        sequence = 0
+        while time.perf_counter() < deadline:
+            scheduled_at, next_send = await _pace(next_send, interval)
+            sequence += 1
+            if not open_loop:
+                protocol.reply = loop.create_future()
+                protocol.expected = sequence
+            transport.sendto(make_load_message(size, scheduled_at, sequence))
+            stats.sent += 1
+            if not open_loop:
+                try:
+                    await asyncio.wait_for(protocol.reply, timeout)
+                except asyncio.TimeoutError:
+                    pass
+        # Даём дойти ответам на последние сообщения
+        await asyncio.sleep(0.2 if open_loop else 0)
+    finally:
+        transport.close()
+
+
+async def _run_load(protocol, host, port, connections, rate, duration, size, open_loop):
+    stats = LoadStats()
+    interval = connections / rate if rate else 0.0
+    worker = _tcp_load_connection if protocol == 'tcp' else _udp_load_sender
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker(host, port, stats, size, interval, deadline, open_loop)
+                           for _ in range(connections)))
+    return stats, time.perf_counter() - started
+
+
+def _serve_tcp_echo(host, port):
+    EchoServer(host, port, backlog=4096, idle_timeout=None).serve_forever()
+
+
+# Нагрузочный прогон по TCP или UDP на localhost: connections соединений/отправителей,
+# rate - целевая суммарная частота сообщений (0 - максимально быстро),
+# open_loop - отправка по расписанию без ожидания ответов.
+# При spawn_server echo-сервер запускается в отдельном процессе, так что прогон
+# полностью самодостаточен (например, в CI).
+def run_load(protocol='tcp', host='localhost', port=None, connections=10, rate=0.0,
+             duration=5.0, size=64, open_loop=False, spawn_server=False):
+    port = port or (12345 if protocol == 'tcp' else 12346)
+    server = None
+    if spawn_server:
+        if protocol == 'tcp':
+            server = multiprocessing.Process(target=_serve_tcp_echo, args=(host, port), daemon=True)
+            server.start()
+            for _ in range(50):
+                try:
+                    socket.create_connection((host, port), timeout=0.1).close()
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        else:
+            server = UdpIngestServer(host, port, workers=1, report_interval=None)
+            server.start()
+            time.sleep(0.5)
+
+    try:
+        stats, elapsed = asyncio.run(
+            _run_load(protocol, host, port, connections, rate, duration, size, open_loop))
+    finally:
+        if isinstance(server, UdpIngestServer):
+            server.stop()
+        elif server is not None:
+            server.terminate()
+            server.join()
+
+    mode = "открытый цикл" if open_loop else "закрытый цикл"
+    stats.report(f"{protocol.upper()}, {connections} соединений, {mode}", elapsed)
+    return stats
+
 def main():
     # Запуск TCP-сервера в отдельном потоке
     tcp_server_thread = threading.Thread(target=tcp_server)
@@ -69,4 +774,72 @@ def main():
     threading.Timer(1.0, udp_client).start()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="mode")
+
+    server_parser = subparsers.add_parser("tcp-server", help="многопользовательский TCP echo-сервер")
+    server_parser.add_argument("--host", default="localhost")
+    server_parser.add_argument("--port", type=int, default=12345)
+    server_parser.add_argument("--backlog", type=int, default=1024)
+    server_parser.add_argument("--buffer-size", type=int, default=64 * 1024)
+    server_parser.add_argument("--idle-timeout", type=float, default=60.0)
+    server_parser.add_argument("--max-connections", type=int, default=10000)
+    server_parser.add_argument("--report-interval", type=float, default=5.0)
+
+    udp_parser = subparsers.add_parser("udp-server", help="UDP-приём в N процессах через SO_REUSEPORT")
+    udp_parser.add_argument("--host", default="localhost")
+    udp_parser.add_argument("--port", type=int, default=12346)
+    udp_parser.add_argument("--workers", type=int, default=None)
+    udp_parser.add_argument("--batch-size", type=int, default=64)
+    udp_parser.add_argument("--datagram-size", type=int, default=2048)
+    udp_parser.add_argument("--rcvbuf", type=int, default=4 * 1024 * 1024)
+    udp_parser.add_argument("--report-interval", type=float, default=5.0)
+
+    load_parser = subparsers.add_parser("load", help="нагрузочный прогон с замером задержек")
+    load_parser.add_argument("--protocol", choices=["tcp", "udp"], default="tcp")
+    load_parser.add_argument("--host", default="localhost")
+    load_parser.add_argument("--port", type=int, default=None)
+    load_parser.add_argument("--connections", type=int, default=10)
+    load_parser.add_argument("--rate", type=float, default=0.0, help="сообщений в секунду, 0 - без ограничения")
+    load_parser.add_argument("--duration", type=float, default=5.0)
+    load_parser.add_argument("--size", type=int, default=64)
+    load_parser.add_argument("--open-loop", action="store_true")
+    load_parser.add_argument("--spawn-server", action="store_true", help="запустить локальный echo-сервер")
+    load_parser.add_argument("--max-errors", type=int, default=0,
+                             help="больше ошибок - код выхода 1")
+    load_parser.add_argument("--max-loss", type=float, default=0.0,
+                             help="большая доля потерянных сообщений - код выхода 1")
+
+    subparsers.add_parser("framing-bench", help="пропускная способность кадрированного TCP, 64 Б - 64 МБ")
+
+    args = parser.parse_args()
+    if args.mode == "framing-bench":
+        framing_benchmark()
+    elif args.mode == "load":
+        stats = run_load(args.protocol, args.host, args.port, args.connections, args.rate,
+                         args.duration, args.size, args.open_loop, args.spawn_server)
+        failure = stats.failure(args.max_errors, args.max_loss)
+        if failure:
+            print(f"Прогон не пройден: {failure}")
+            sys.exit(1)
+    elif args.mode == "udp-server":
+        server = UdpIngestServer(args.host, args.port, args.workers, echo_batch, args.batch_size,
+                                 args.datagram_size, args.rcvbuf, args.report_interval)
+        server.start()
+        print(f"UDP-сервер: {server.workers} воркеров на {args.host}:{args.port}")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.stop()
+            print("Сервер остановлен")
+    elif args.mode == "tcp-server":
+        server = EchoServer(args.host, args.port, args.backlog, args.buffer_size,
+                            args.idle_timeout, args.max_connections, args.report_interval)
+        print(f"TCP echo-сервер слушает {args.host}:{server.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            print("Сервер остановлен")
+    else:
+        main()
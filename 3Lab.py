@@ -1,79 +1,163 @@
+import os
+import json
+import time
 import sqlite3
-import requests
+import tempfile
+import argparse
+import threading
+from collections import OrderedDict
+
+from http_cache import get_default_cache
+from posts_db import apply_sync, create_sync_table, get_manager, plan_sync
+from posts_stream import POSTS_URL, iter_posts
+
+# Соединения с posts.db выдаёт общий менеджер (posts_db.get_manager): PRAGMA
+# (WAL, synchronous=NORMAL, кэш 64 МБ) применяются один раз, соединения не
+# переоткрываются на каждый вызов
+
+POSTS_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS posts (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        title TEXT,
+        body TEXT
+    )
+'''
 
 # Функция для создания базы данных и таблицы
-def create_database():
-    conn = sqlite3.connect('posts.db')
-    cursor = conn.cursor()
-    
-    # Создаем таблицу posts
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS posts (
-            id INTEGER PRIMARY KEY,
-            user_id INTEGER,
-            title TEXT,
-            body TEXT
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
+def create_database(db_name='posts.db'):
+    with get_manager(db_name).writer() as conn:
+        # Создаем таблицу posts
+        conn.execute(POSTS_SCHEMA)
+        create_indexes(conn)
+        create_sync_table(conn)
+
+# Индексы под используемые выборки: посты пользователя по user_id. Записи индекса
+# уже содержат rowid (это id), так что они упорядочены по (user_id, id) и ORDER BY id
+# не сортирует; title и body читаются из таблицы по rowid - индекс не покрывающий,
+# покрывающий повторил бы всю таблицу
+def create_indexes(conn):
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_posts_user_id ON posts (user_id)')
 
 # Функция для очистки таблицы
-def clear_table():
-    conn = sqlite3.connect('posts.db')
-    cursor = conn.cursor()
-    
-    cursor.execute('DELETE FROM posts')
-    
-    conn.commit()
-    conn.close()
+def clear_table(db_name='posts.db'):
+    with get_manager(db_name).writer() as conn:
+        conn.execute('DELETE FROM posts')
+        # Хэши синхронизации тоже сбрасываются (в той же транзакции), иначе посты не загрузятся заново
+        conn.execute('DELETE FROM posts_sync')
+    invalidate_read_cache(db_name)
 
-# Функция для получения данных с тестового сервера
-def fetch_data():
-    response = requests.get('https://jsonplaceholder.typicode.com/posts')
+# Функция для получения данных с тестового сервера.
+# При stream=True возвращает ленивый итератор постов, отфильтрованных predicate,
+# иначе - список из общего HTTP-кэша (неизменённая коллекция стоит одного ответа 304).
+def fetch_data(stream=False, predicate=None):
+    if stream:
+        return iter_posts(POSTS_URL, predicate)
+    response = get_default_cache().get(POSTS_URL)
     if response.status_code == 200:
         return response.json()
     else:
         raise Exception(f"Ошибка при получении данных: {response.status_code}")
 
-# Функция для сохранения данных в базу данных
-def save_data_to_db(posts):
-    conn = sqlite3.connect('posts.db')
-    cursor = conn.cursor()
-    
-    for post in posts:
-        cursor.execute('''
+# Функция для сохранения данных в базу данных.
+# posts - любой итерируемый объект (в том числе поток из fetch_data(stream=True)):
+# строки уходят в один executemany в одной транзакции, а повторная загрузка
+# обновляет существующие записи (upsert) вместо удаления всей таблицы.
+# Неизменённые строки не перезаписываются.
+def save_data_to_db(posts, db_name='posts.db'):
+    rows = ((post['id'], post['userId'], post['title'], post['body']) for post in posts)
+    with get_manager(db_name).writer() as conn:
+        conn.executemany('''
             INSERT INTO posts (id, user_id, title, body)
             VALUES (?, ?, ?, ?)
-        ''', (post['id'], post['userId'], post['title'], post['body']))
-    
-    conn.commit()
-    conn.close()
+            ON CONFLICT(id) DO UPDATE SET
+                user_id = excluded.user_id,
+                title = excluded.title,
+                body = excluded.body
+            WHERE posts.user_id IS NOT excluded.user_id
+               OR posts.title IS NOT excluded.title
+               OR posts.body IS NOT excluded.body
+        ''', rows)
+    invalidate_read_cache(db_name)
+
+# Функция для синхронизации таблицы с удалённой лентой: записывается только разница
+# (новые, изменённые и пропавшие посты); возвращает сводку изменений.
+# Разница с лентой считается на соединении чтения, блокировка записи держится
+# только на время её применения
+def sync_data_to_db(posts, db_name='posts.db'):
+    manager = get_manager(db_name)
+    plan = plan_sync(manager.reader(), posts)
+    with manager.writer() as conn:
+        summary = apply_sync(conn, plan, keep_remote_ids=True)
+    if summary.inserted or summary.updated or summary.deleted:
+        invalidate_read_cache(db_name)
+    return summary
+
+# Результаты выборок по user_id кэшируются; функции записи сбрасывают кэш.
+# Поколение растёт при каждом сбросе: выборка, начатая до сброса, могла прочитать
+# старые строки и в кэш их не кладёт
+_read_cache = OrderedDict()
+_read_cache_lock = threading.Lock()
+_read_cache_generation = 0
+READ_CACHE_SIZE = 4096
+
+def invalidate_read_cache(db_name=None):
+    global _read_cache_generation
+    with _read_cache_lock:
+        _read_cache_generation += 1
+        if db_name is None:
+            _read_cache.clear()
+        else:
+            for key in [key for key in _read_cache if key[0] == db_name]:
+                del _read_cache[key]
 
 # Функция для чтения данных из базы данных
-def read_data_from_db(user_id):
-    conn = sqlite3.connect('posts.db')
-    cursor = conn.cursor()
+def read_data_from_db(user_id, db_name='posts.db'):
+    key = (db_name, user_id)
+    with _read_cache_lock:
+        posts = _read_cache.get(key)
+        if posts is not None:
+            _read_cache.move_to_end(key)
+            return list(posts)
+        generation = _read_cache_generation
     
-    cursor.execute('SELECT * FROM posts WHERE user_id = ?', (user_id,))
+    cursor = get_manager(db_name).reader().cursor()
+    cursor.execute('SELECT * FROM posts WHERE user_id = ? ORDER BY id', (user_id,))
     posts = cursor.fetchall()
     
-    conn.close()
-    return posts
+    with _read_cache_lock:
+        if generation == _read_cache_generation:
+            _read_cache[key] = posts
+            if len(_read_cache) > READ_CACHE_SIZE:
+                _read_cache.popitem(last=False)
+    return list(posts)
+
+# Пакетное чтение: посты сразу многих пользователей одним запросом,
+# результат - словарь {user_id: [посты]}
+def read_data_for_users(user_ids, db_name='posts.db'):
+    user_ids = list(dict.fromkeys(user_ids))
+    result = {user_id: [] for user_id in user_ids}
+    cursor = get_manager(db_name).reader().cursor()
+    cursor.execute('''
+        SELECT * FROM posts
+        WHERE user_id IN (SELECT value FROM json_each(?))
+        ORDER BY user_id, id
+    ''', (json.dumps(user_ids),))
+    for post in cursor:
+        result[post[1]].append(post)
+    return result
 
 def main():
     # Создание базы данных и таблицы
     create_database()
     
-    # Очистка таблицы перед вставкой новых данных
-    clear_table()
-    
     # Получение данных с сервера
     posts = fetch_data()
     
-    # Сохранение данных в базу данных
-    save_data_to_db(posts)
+    # Синхронизация базы данных: записывается только то, что изменилось
+    summary = sync_data_to_db(posts)
+    print(f"Добавлено: {summary.inserted}, изменено: {summary.updated}, "
+          f"удалено: {summary.deleted}, без изменений: {summary.unchanged}")
     
     # Чтение данных из базы данных
     user_id = 1  # Пример user_id для выборки
@@ -81,5 +165,113 @@ def main():
     for post in user_posts:
         print(post)
 
+# Таблица для прежнего способа записи: обычное соединение, без PRAGMA менеджера
+# (WAL записывается в сам файл БД и остался бы у базовой линии бенчмарка)
+def create_plain_database(db_name):
+    conn = sqlite3.connect(db_name)
+    conn.execute(POSTS_SCHEMA)
+    create_indexes(conn)
+    conn.commit()
+    conn.close()
+
+# Прежний способ записи: отдельный execute на каждую строку без настройки PRAGMA
+def save_data_row_by_row(posts, db_name):
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    for post in posts:
+        cursor.execute('''
+            INSERT INTO posts (id, user_id, title, body)
+            VALUES (?, ?, ?, ?)
+        ''', (post['id'], post['userId'], post['title'], post['body']))
+    conn.commit()
+    conn.close()
+
+def generate_posts(count, users=10):
+    for i in range(1, count + 1):
+        yield {'id': i, 'userId': i % users + 1, 'title': f'Заголовок {i}', 'body': f'Текст поста {i}'}
+
+# Бенчмарк записи: строк в секунду для построчной вставки, пакетной вставки
+# и повторной загрузки тех же данных (upsert). Построчная вставка и executemany
+# пишут каждая в свой новый файл; upsert - повтор в файл executemany.
+def benchmark(sizes=(10_000, 1_000_000, 10_000_000)):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for count in sizes:
+            row_db = os.path.join(tmp_dir, f'row_{count}.db')
+            bulk_db = os.path.join(tmp_dir, f'bulk_{count}.db')
+            results = []
+            for name, writer, db_name, create in (
+                    ('построчно', save_data_row_by_row, row_db, create_plain_database),
+                    ('executemany', save_data_to_db, bulk_db, create_database),
+                    ('повтор (upsert)', save_data_to_db, bulk_db, None)):
+                if create is not None:
+                    create(db_name)
+                started = time.perf_counter()
+                writer(generate_posts(count), db_name)
+                results.append(f"{name}: {count / (time.perf_counter() - started):,.0f} строк/с")
+            get_manager(bulk_db).close()
+            print(f"{count:>12,} строк | " + " | ".join(results))
+
+# Бенчмарк чтения на таблице из count строк (по 10 постов на пользователя):
+# прежний способ (новое соединение и полный просмотр), индекс с постоянным
+# соединением, пакетные запросы и кэш результатов
+def benchmark_reads(count=2_000_000, lookups=2000):
+    users = max(1, count // 10)
+    lookups = min(lookups, users)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_name = os.path.join(tmp_dir, 'read_bench.db')
+        create_database(db_name)
+        save_data_to_db(generate_posts(count, users), db_name)
+        with get_manager(db_name).writer() as conn:
+            conn.execute('DROP INDEX idx_posts_user_id')
+
+        def report(name, run, done):
+            invalidate_read_cache()
+            started = time.perf_counter()
+            run()
+            print(f"{name:<32} {done / (time.perf_counter() - started):>12,.0f} выборок/с")
+
+        def old_way():
+            for user_id in range(1, lookups // 100 + 2):
+                conn = sqlite3.connect(db_name)
+                conn.execute('SELECT * FROM posts WHERE user_id = ?', (user_id,)).fetchall()
+                conn.close()
+
+        def indexed():
+            for user_id in range(1, lookups + 1):
+                read_data_from_db(user_id, db_name)
+                invalidate_read_cache()
+
+        def batched():
+            for start in range(1, lookups + 1, 100):
+                read_data_for_users(range(start, min(start + 100, lookups + 1)), db_name)
+
+        def cached():
+            for _ in range(10):
+                for user_id in range(1, lookups + 1):
+                    read_data_from_db(user_id, db_name)
+
+        print(f"Таблица: {count:,} строк, {users:,} пользователей")
+        report("без индекса, новое соединение", old_way, lookups // 100 + 1)
+        with get_manager(db_name).writer() as conn:
+            create_indexes(conn)
+        report("индекс, постоянное соединение", indexed, lookups)
+        report("пакетами по 100", batched, lookups)
+        report("с кэшем (10 проходов)", cached, 10 * lookups)
+        get_manager(db_name).close()
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bench", nargs="*", type=int, metavar="ROWS",
+                        help="бенчмарк записи на таблицах из ROWS строк (по умолчанию 10k, 1M, 10M)")
+    parser.add_argument("--bench-read", nargs="*", type=int, metavar="N",
+                        help="бенчмарк чтения: число строк и число выборок")
+    args = parser.parse_args()
+
+    if args.bench_read is not None:
+        if len(args.bench_read) > 2:
+            parser.error("--bench-read: не больше двух чисел (строк и выборок)")
+        benchmark_reads(*args.bench_read)
+    elif args.bench is not None:
+        benchmark(args.bench or (10_000, 1_000_000, 10_000_000))
+    else:
+        main()
\ No newline at end of file
@@ -1,15 +1,32 @@
 import sys
+import startup
+startup.start()  # --profile-startup: the import hook must be installed before other modules
+
+import csv
+import time
 import sqlite3
+from PyQt5.QtCore import (
+    Qt, QAbstractTableModel, QModelIndex, QObject, QThread, QTimer, pyqtSignal, pyqtSlot
+)
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QTableView, QVBoxLayout, QPushButton,
-    QLineEdit, QDialog, QFormLayout, QDialogButtonBox, QWidget, QMessageBox
+    QLineEdit, QDialog, QFormLayout, QDialogButtonBox, QWidget, QMessageBox,
+    QFileDialog, QProgressDialog
+)
+
+from posts_db import (
+    create_search_index, delete_posts, export_posts, get_manager, import_posts, search_posts
 )
-from PyQt5.QtSql import QSqlDatabase, QSqlTableModel
+from posts_model import PagedPostsModel
+
+SEARCH_DEBOUNCE_MS = 250
+SEARCH_LIMIT = 10000
 
 
+# Table operations go through the shared posts_db connection manager
 class DatabaseManager:
     def __init__(self, db_name):
-        self.conn = sqlite3.connect(db_name)
+        self.db = get_manager(db_name)
         self.create_table()
 
     def create_table(self):
@@ -21,18 +38,31 @@ class DatabaseManager:
             body TEXT
         )
         """
-        self.conn.execute(query)
-        self.conn.commit()
+        with self.db.writer() as conn:
+            conn.execute(query)
+            create_search_index(conn)
 
     def add_record(self, user_id, title, body):
         query = "INSERT INTO posts (user_id, title, body) VALUES (?, ?, ?)"
-        self.conn.execute(query, (user_id, title, body))
-        self.conn.commit()
+        with self.db.writer() as conn:
+            conn.execute(query, (user_id, title, body))
 
     def delete_record(self, record_id):
         query = "DELETE FROM posts WHERE id = ?"
-        self.conn.execute(query, (record_id,))
-        self.conn.commit()
+        with self.db.writer() as conn:
+            conn.execute(query, (record_id,))
+
+    # Bulk operations: each call is one pass over the data instead of a commit per row
+
+    def delete_records(self, record_ids):
+        with self.db.writer() as conn:
+            return delete_posts(conn, record_ids)
+
+    def import_file(self, path, progress=None):
+        return import_posts(self.db, path, progress)
+
+    def export_file(self, path, progress=None):
+        return export_posts(self.db, path, progress)
 
 
 class AddRecordDialog(QDialog):
@@ -58,13 +88,76 @@ class AddRecordDialog(QDialog):
         self.layout.addWidget(self.buttons)
 
 
+# Runs full-text queries on a background thread with bound parameters.
+# Requests carry a generation number; a request that is already outdated when
+# it reaches the worker is skipped, and a running one is interrupted by the GUI.
+# At most SEARCH_LIMIT rows are returned; the flag tells whether more matched.
+class SearchWorker(QObject):
+    results_ready = pyqtSignal(int, list, bool)
+    search_failed = pyqtSignal(int, str)
+
+    def __init__(self, db_name):
+        super().__init__()
+        self.db_name = db_name
+        self.latest_generation = 0
+        self.conn = None
+
+    @pyqtSlot(int, str)
+    def run_query(self, generation, text):
+        if generation != self.latest_generation:
+            return
+        self.conn = get_manager(self.db_name).reader()
+        try:
+            rows = search_posts(self.conn, text, limit=SEARCH_LIMIT + 1)
+        except sqlite3.Error as error:
+            if isinstance(error, sqlite3.OperationalError) and "interrupted" in str(error):
+                # Interrupted because a newer query was requested
+                return
+            self.search_failed.emit(generation, str(error))
+            return
+        self.results_ready.emit(generation, rows[:SEARCH_LIMIT], len(rows) > SEARCH_LIMIT)
+
+    def cancel(self):
+        if self.conn is not None:
+            self.conn.interrupt()
+
+
+# Read-only model holding the rows of the current search result
+class SearchResultsModel(QAbstractTableModel):
+    HEADERS = ("id", "user_id", "title", "body")
+
+    def __init__(self, rows, parent=None):
+        super().__init__(parent)
+        self.rows = rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role in (Qt.DisplayRole, Qt.EditRole) and index.isValid():
+            return self.rows[index.row()][index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+
 class MainWindow(QMainWindow):
+    search_requested = pyqtSignal(int, str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("PyQt5 Database Manager")
         self.setGeometry(100, 100, 800, 600)
 
-        self.database_manager = DatabaseManager("posts.db")
+        # The database and the table model are opened after the first paint
+        self.database_manager = None
+        self.model = None
 
         # Set up the layout
         self.central_widget = QWidget(self)
@@ -74,9 +167,25 @@ class MainWindow(QMainWindow):
         # Search bar
         self.search_bar = QLineEdit(self)
         self.search_bar.setPlaceholderText("Search by title...")
-        self.search_bar.textChanged.connect(self.filter_records)
+        self.search_bar.textChanged.connect(self.on_search_text_changed)
         self.layout.addWidget(self.search_bar)
 
+        # Search pipeline: keystrokes are debounced, queries run on a worker thread
+        self.search_stats = {"keystrokes": 0, "queries": 0, "stale": 0, "gui_blocked_ms": 0.0}
+        self.search_generation = 0
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.filter_records)
+
+        self.search_thread = QThread(self)
+        self.search_worker = SearchWorker("posts.db")
+        self.search_worker.moveToThread(self.search_thread)
+        self.search_requested.connect(self.search_worker.run_query)
+        self.search_worker.results_ready.connect(self.show_search_results)
+        self.search_worker.search_failed.connect(self.show_search_error)
+        self.search_thread.start()
+
         # Table view
         self.table_view = QTableView(self)
         self.layout.addWidget(self.table_view)
@@ -94,27 +203,81 @@ class MainWindow(QMainWindow):
         self.delete_button.clicked.connect(self.delete_record)
         self.layout.addWidget(self.delete_button)
 
-        # Database connection
-        self.db = QSqlDatabase.addDatabase("QSQLITE")
-        self.db.setDatabaseName("posts.db")
-        if not self.db.open():
-            QMessageBox.critical(self, "Database Error", self.db.lastError().text())
-            sys.exit(1)
+        self.import_button = QPushButton("Import...", self)
+        self.import_button.clicked.connect(self.import_records)
+        self.layout.addWidget(self.import_button)
 
-        # Table model
-        self.model = QSqlTableModel(self, self.db)
-        self.model.setTable("posts")
-        self.model.select()
+        self.export_button = QPushButton("Export...", self)
+        self.export_button.clicked.connect(self.export_records)
+        self.layout.addWidget(self.export_button)
 
+        self.data_widgets = (self.search_bar, self.refresh_button, self.add_button,
+                             self.delete_button, self.import_button, self.export_button)
+        for widget in self.data_widgets:
+            widget.setEnabled(False)
+        startup.after_first_paint(self, self.open_database)
+
+    def open_database(self):
+        self.database_manager = DatabaseManager("posts.db")
+
+        # Table model: rows are read lazily in keyset-paginated pages through the
+        # shared connection manager; edits are written back through it as well
+        self.model = PagedPostsModel(self.database_manager.db, editable=True, parent=self)
         self.table_view.setModel(self.model)
-        self.load_data()
+        for widget in self.data_widgets:
+            widget.setEnabled(True)
+        startup.mark("database and table opened")
 
     def load_data(self):
-        self.model.select()
+        self.model.refresh()
+        if self.search_bar.text().strip():
+            self.filter_records()
+
+    def on_search_text_changed(self):
+        self.search_stats["keystrokes"] += 1
+        self.search_timer.start()
 
     def filter_records(self):
+        started = time.perf_counter()
         filter_text = self.search_bar.text()
-        self.model.setFilter(f"title LIKE '%{filter_text}%'")
+        self.search_generation += 1
+        self.search_worker.latest_generation = self.search_generation
+        self.search_worker.cancel()
+
+        if filter_text.strip():
+            self.search_stats["queries"] += 1
+            self.search_requested.emit(self.search_generation, filter_text)
+        elif self.table_view.model() is not self.model:
+            self.table_view.setModel(self.model)
+        self._track_gui_time(started)
+
+    def show_search_results(self, generation, rows, truncated):
+        if generation != self.search_generation:
+            self.search_stats["stale"] += 1
+            return
+        started = time.perf_counter()
+        self.table_view.setModel(SearchResultsModel(rows, self))
+        note = f"Showing the first {len(rows)} matches, refine the search. " if truncated else ""
+        self._track_gui_time(started, note)
+
+    def show_search_error(self, generation, message):
+        if generation == self.search_generation:
+            self.statusBar().showMessage(f"Search failed: {message}")
+
+    def _track_gui_time(self, started, note=""):
+        self.search_stats["gui_blocked_ms"] += (time.perf_counter() - started) * 1000
+        self.statusBar().showMessage(
+            f"{note}Keystrokes: {self.search_stats['keystrokes']}, "
+            f"queries: {self.search_stats['queries']}, "
+            f"stale results: {self.search_stats['stale']}, "
+            f"GUI thread blocked: {self.search_stats['gui_blocked_ms']:.1f} ms"
+        )
+
+    def closeEvent(self, event):
+        self.search_worker.cancel()
+        self.search_thread.quit()
+        self.search_thread.wait()
+        super().closeEvent(event)
 
     def add_record(self):
         dialog = AddRecordDialog(self)
@@ -135,14 +298,59 @@ class MainWindow(QMainWindow):
                 QMessageBox.Yes | QMessageBox.No
             )
             if reply == QMessageBox.Yes:
-                for index in selected_indexes:
-                    record_id = self.model.data(self.model.index(index.row(), 0))
-                    self.database_manager.delete_record(record_id)
+                model = self.table_view.model()
+                rows = sorted(index.row() for index in selected_indexes)
+                record_ids = [model.data(model.index(row, 0)) for row in rows]
+                self.database_manager.delete_records(record_ids)
                 self.load_data()
 
+    def _progress_dialog(self, label):
+        dialog = QProgressDialog(label, None, 0, 1000, self)
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(500)
+
+        def update(done, total):
+            dialog.setValue(int(1000 * done / total) if total else 1000)
+            QApplication.processEvents()
+
+        return dialog, update
+
+    def import_records(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Import records", "", "Data files (*.csv *.jsonl)")
+        if path:
+            dialog, update = self._progress_dialog("Importing records...")
+            try:
+                count = self.database_manager.import_file(path, update)
+            except (OSError, ValueError, KeyError, csv.Error, sqlite3.Error) as error:
+                QMessageBox.critical(self, "Import Error", str(error))
+                return
+            finally:
+                dialog.close()
+            self.load_data()
+            self.statusBar().showMessage(f"Imported {count} records", 5000)
+
+    def export_records(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export records", "posts.csv", "CSV (*.csv);;JSON Lines (*.jsonl)")
+        if path:
+            dialog, update = self._progress_dialog("Exporting records...")
+            try:
+                count = self.database_manager.export_file(path, update)
+            except OSError as error:
+                QMessageBox.critical(self, "Export Error", str(error))
+                return
+            finally:
+                dialog.close()
+            self.statusBar().showMessage(f"Exported {count} records", 5000)
+
 
 if __name__ == "__main__":
+    startup.mark("imports")
     app = QApplication(sys.argv)
+    startup.mark("QApplication")
     window = MainWindow()
+    startup.mark("window created")
     window.show()
+    startup.report_after_first_paint(window, app)
     sys.exit(app.exec_())
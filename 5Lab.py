@@ -1,15 +1,198 @@
 import sys
+import startup
+startup.start()  # --profile-startup: перехват импортов должен стоять до остальных модулей
+
+import json
+import time
+import queue
+import sqlite3
 import asyncio
+import itertools
+import threading
+import traceback
+from contextlib import contextmanager
+
 import asyncqt
-import sqlite3
-import requests
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout,
     QTableView, QLineEdit, QPushButton, QWidget, QMessageBox,
     QProgressBar, QStatusBar, QDialog, QFormLayout, QDialogButtonBox
 )
-from PyQt5.QtGui import QStandardItemModel, QStandardItem
+
+from async_fetch import fetch_all_json
+from posts_db import (SyncSummary, apply_sync, create_search_index, create_sync_table, delete_posts,
+                      get_manager, plan_sync, prune_posts, sync_watermark)
+from posts_model import PagedPostsModel
+from title_index import TitleIndex
+
+# Источники постов: одна коллекция или её страницы/шарды (например, "...?userId=1"),
+# которые загружаются параллельно, не больше FETCH_CONCURRENCY одновременно
+POST_SOURCES = ["https://jsonplaceholder.typicode.com/posts"]
+FETCH_CONCURRENCY = 4
+
+# Интервал опроса обновлений, мс: растёт, пока изменений нет, и сокращается при изменениях
+UPDATE_INTERVAL = 10000
+UPDATE_INTERVAL_MIN = 2000
+UPDATE_INTERVAL_MAX = 120000
+
+WRITE_BATCH_SIZE = 2000  # Постов в одной транзакции при сохранении загрузки
+WRITE_GROUP_LIMIT = 100  # Сколько мелких заданий из очереди объединяется в одну транзакцию
+
+
+# URL источника с курсором: только посты с id больше watermark
+def updates_url(url, watermark):
+    separator = "&" if "?" in url else "?"
+    return f"{url}{separator}id_gte={watermark + 1}"
+
+
+# Поток записи в posts.db. Задания берутся из очереди по порядку: мелкие (вставка,
+# удаление) объединяются в одну транзакцию, а сохранение загрузки разбивается на
+# пачки по batch_size постов с фиксацией после каждой. После каждой фиксации
+# отправляются сигналы с прогрессом и id изменённых строк, так что таблица
+# обновляется по частям, а окно не замирает.
+class DbWriter(QThread):
+    progress = pyqtSignal(int, int, int)  # id задания, обработано, всего
+    rows_changed = pyqtSignal(list)
+    job_finished = pyqtSignal(int, object)
+    job_failed = pyqtSignal(int, str)
+
+    def __init__(self, manager, batch_size=WRITE_BATCH_SIZE, group_limit=WRITE_GROUP_LIMIT, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.batch_size = batch_size
+        self.group_limit = group_limit
+        self.queue = queue.Queue()
+        self.metrics = {"jobs": 0, "commits": 0, "queue_depth_max": 0,
+                        "commit_time_total": 0.0, "commit_time_max": 0.0}
+        self._job_ids = itertools.count(1)
+        self._cancelled = set()
+        self._cancel_syncs = False
+        self._lock = threading.Lock()
+
+    # kind: "sync" (вся лента постов), "merge" (только новые или изменённые посты),
+    # "insert" (user_id, title, body), "delete" (список id)
+    def submit(self, kind, payload):
+        job_id = next(self._job_ids)
+        self.queue.put((job_id, kind, payload))
+        depth = self.queue.qsize()
+        with self._lock:
+            self.metrics["jobs"] += 1
+            self.metrics["queue_depth_max"] = max(self.metrics["queue_depth_max"], depth)
+        return job_id
+
+    # Отмена сохранения загрузки: уже зафиксированные пачки остаются
+    def cancel(self, job_id):
+        with self._lock:
+            self._cancelled.add(job_id)
+
+    # Отмена всех поставленных и выполняющегося сохранений ленты (при закрытии окна):
+    # ленту можно загрузить заново, а правки пользователя перед stop() дописываются
+    def cancel_syncs(self):
+        with self._lock:
+            self._cancel_syncs = True
+
+    # Дожидается выполнения всех поставленных заданий
+    def stop(self):
+        self.queue.put((0, "stop", None))
+        self.wait()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.metrics)
+        stats["queue_depth"] = self.queue.qsize()
+        stats["commit_time_avg"] = stats["commit_time_total"] / stats["commits"] if stats["commits"] else 0.0
+        return stats
+
+    def run(self):
+        pending = None
+        while True:
+            job = pending if pending is not None else self.queue.get()
+            pending = None
+            if job[1] == "stop":
+                return
+            if job[1] in ("sync", "merge"):
+                self._run_sync(*job)
+                continue
+            group = [job]
+            while len(group) < self.group_limit:
+                try:
+                    job = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job[1] in ("stop", "sync", "merge"):
+                    pending = job
+                    break
+                group.append(job)
+            self._run_group(group)
+
+    # Время транзакции вместе с фиксацией
+    @contextmanager
+    def _transaction(self):
+        started = time.perf_counter()
+        with self.manager.writer() as conn:
+            yield conn
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.metrics["commits"] += 1
+            self.metrics["commit_time_total"] += elapsed
+            self.metrics["commit_time_max"] = max(self.metrics["commit_time_max"], elapsed)
+
+    def _run_group(self, group):
+        changed = set()
+        results = []
+        try:
+            with self._transaction() as conn:
+                for job_id, kind, payload in group:
+                    if kind == "insert":
+                        cursor = conn.execute("INSERT INTO posts (user_id, title, body) VALUES (?, ?, ?)", payload)
+                        changed.add(cursor.lastrowid)
+                        results.append((job_id, cursor.lastrowid))
+                    else:
+                        changed.update(int(record_id) for record_id in payload)
+                        results.append((job_id, delete_posts(conn, payload)))
+        except (sqlite3.Error, TypeError, ValueError) as error:
+            if len(group) == 1:
+                self.job_failed.emit(group[0][0], str(error))
+                return
+            # Одно неудачное задание не должно откатывать остальные
+            for job in group:
+                self._run_group([job])
+            return
+        self.rows_changed.emit(sorted(changed))
+        for job_id, result in results:
+            self.job_finished.emit(job_id, result)
+
+    def _run_sync(self, job_id, kind, posts):
+        total = len(posts)
+        inserted = updated = unchanged = 0
+        try:
+            for start in range(0, total, self.batch_size):
+                with self._lock:
+                    if job_id in self._cancelled or self._cancel_syncs:
+                        self._cancelled.discard(job_id)
+                        self.job_failed.emit(job_id, "Сохранение отменено")
+                        return
+                changed = set()
+                # Разница считается на соединении чтения этого потока, вне транзакции записи
+                plan = plan_sync(self.manager.reader(), posts[start:start + self.batch_size], full=False)
+                with self._transaction() as conn:
+                    part = apply_sync(conn, plan, changed_ids=changed)
+                inserted += part.inserted
+                updated += part.updated
+                unchanged += part.unchanged
+                self.rows_changed.emit(sorted(changed))
+                self.progress.emit(job_id, min(start + self.batch_size, total), total)
+            deleted = 0
+            if kind == "sync":
+                changed = set()
+                with self._transaction() as conn:
+                    deleted = prune_posts(conn, [post['id'] for post in posts], changed)
+                self.rows_changed.emit(sorted(changed))
+        except (sqlite3.Error, TypeError, ValueError, KeyError) as error:
+            self.job_failed.emit(job_id, str(error))
+            return
+        self.job_finished.emit(job_id, SyncSummary(inserted, updated, deleted, unchanged))
 
 
 class MainApp(QMainWindow):
@@ -17,26 +200,62 @@ class MainApp(QMainWindow):
         super().__init__()
         self.setWindowTitle("Многозадачное приложение")
         self.resize(800, 600)
-        self.db_connection = sqlite3.connect("posts.db")
-        self.create_table_if_not_exists()  # Создать таблицу, если её нет
+        self.db = get_manager("posts.db")  # Общий менеджер соединений с posts.db
+        self.model = None
+        self.db_writer = None
+        self.index_task = None
+        self.load_task = None  # Текущая загрузка; повторный клик отменяет её
+        self.update_task = None
+        self.update_cursor = None  # Наибольший удалённый id в БД; None - прочитать из posts_sync
+        self.update_interval = UPDATE_INTERVAL
+        self.title_index = None  # Индекс заголовков для поиска; строится в фоне
+        self.index_pending = set()  # id, изменённые, пока индекс строился
+        self.search_ids = None
+        self.pending_writes = {}
         self.init_ui()
 
-        # Настройка таймера для периодических обновлений
+        # Таймер опроса обновлений; перезапускается после каждой проверки
         self.timer = QTimer()
+        self.timer.setSingleShot(True)
         self.timer.timeout.connect(self.check_updates)
-        self.timer.start(10000)  # Проверка каждые 10 секунд
+
+        # БД, таблица и фоновые службы открываются после первой отрисовки окна
+        startup.after_first_paint(self, self.open_database)
+
+    def open_database(self):
+        self.create_table_if_not_exists()  # Создать таблицу, если её нет
+
+        # Модель данных
+        self.model = PagedPostsModel(self.db, headers=["ID", "User ID", "Title", "Body"], parent=self)
+        self.setup_table_model()
+
+        # Все записи в БД выполняются в отдельном потоке
+        self.db_writer = DbWriter(self.db)
+        self.db_writer.progress.connect(self.on_write_progress)
+        self.db_writer.rows_changed.connect(self.model.apply_changes)
+        self.db_writer.rows_changed.connect(self.update_title_index)
+        self.db_writer.job_finished.connect(self.on_write_finished)
+        self.db_writer.job_failed.connect(self.on_write_failed)
+        self.db_writer.start()
+        self.index_task = asyncio.ensure_future(self.build_title_index())
+
+        self.timer.start(self.update_interval)
+        for widget in (self.search_field, self.load_button, self.add_button, self.delete_button):
+            widget.setEnabled(True)
+        startup.mark("БД и таблица открыты")
 
     def create_table_if_not_exists(self):
-        cursor = self.db_connection.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS posts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                title TEXT,
-                body TEXT
-            )
-        """)
-        self.db_connection.commit()
+        with self.db.writer() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS posts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER,
+                    title TEXT,
+                    body TEXT
+                )
+            """)
+            create_search_index(conn)
+            create_sync_table(conn)
 
     def init_ui(self):
         # Основной виджет
@@ -47,16 +266,13 @@ class MainApp(QMainWindow):
         # Поле поиска
         self.search_field = QLineEdit(self)
         self.search_field.setPlaceholderText("Поиск по заголовку...")
+        self.search_field.textChanged.connect(self.filter_table)
         layout.addWidget(self.search_field)
 
         # Таблица
         self.table_view = QTableView(self)
         layout.addWidget(self.table_view)
 
-        # Модель данных
-        self.model = QStandardItemModel(self)
-        self.setup_table_model()
-
         # Кнопки
         button_layout = QHBoxLayout()
         self.load_button = QPushButton("Загрузить данные", self)
@@ -73,6 +289,10 @@ class MainApp(QMainWindow):
         button_layout.addWidget(self.delete_button)
         layout.addLayout(button_layout)
 
+        # До открытия БД искать и изменять нечего
+        for widget in (self.search_field, self.load_button, self.add_button, self.delete_button):
+            widget.setEnabled(False)
+
         # Статус-бар
         self.status_bar = QStatusBar(self)
         self.setStatusBar(self.status_bar)
@@ -88,70 +308,149 @@ class MainApp(QMainWindow):
         layout.addWidget(self.progress_bar)
 
     def setup_table_model(self):
-        self.model.setHorizontalHeaderLabels(["ID", "User ID", "Title", "Body"])
         self.table_view.setModel(self.model)
-        self.load_table_data()
 
     def load_table_data(self):
-        self.model.removeRows(0, self.model.rowCount())  # Очистка таблицы
-        cursor = self.db_connection.cursor()
-        cursor.execute("SELECT * FROM posts")
-        for row in cursor.fetchall():
-            items = [QStandardItem(str(field)) for field in row]
-            self.model.appendRow(items)
+        # Модель читает строки страницами по мере прокрутки, поэтому обновление
+        # сбрасывает только загруженные страницы
+        self.model.refresh()
 
     def filter_table(self):
-        search_text = self.search_field.text().lower()
-        for row in range(self.model.rowCount()):
-            title_item = self.model.item(row, 2)
-            if search_text in title_item.text().lower():
-                self.table_view.setRowHidden(row, False)
+        # Поиск подстроки в заголовке (без учёта регистра) по триграммному индексу в
+        # памяти; модель показывает только найденные id и перечитывается, лишь если они
+        # изменились. Пока индекс строится, фильтр ждёт его: build_title_index повторит поиск.
+        text = self.search_field.text()
+        if self.title_index is None:
+            if text:
+                self.status_bar.showMessage("Индекс поиска строится...")
+            return
+        ids = self.title_index.search(text)
+        if ids != self.search_ids:
+            self.search_ids = ids
+            self.model.set_ids(ids)
+
+    async def build_title_index(self):
+        def build():
+            return TitleIndex(self.db.reader().execute("SELECT id, title FROM posts"))
+
+        index = await asyncio.get_event_loop().run_in_executor(None, build)
+        self.title_index = index
+        pending, self.index_pending = self.index_pending, set()
+        self.update_title_index(sorted(pending))
+        if self.search_field.text():
+            self.search_ids = None
+            self.filter_table()
+
+    # Индекс следует за записями потока записи: изменённые строки перечитываются по id
+    def update_title_index(self, record_ids):
+        if self.title_index is None:
+            self.index_pending.update(record_ids)
+            return
+        if not record_ids:
+            return
+        titles = dict(self.db.reader().execute(
+            "SELECT id, title FROM posts WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(record_ids),)))
+        for record_id in record_ids:
+            if record_id in titles:
+                self.title_index.upsert(record_id, titles[record_id])
             else:
-                self.table_view.setRowHidden(row, True)
+                self.title_index.remove(record_id)
+        if self.search_field.text():
+            self.filter_table()
 
+    # Загрузка идёт в пуле потоков и не блокирует цикл событий; первая половина
+    # прогресс бара отражает реально полученные байты
     async def fetch_data(self):
-        url = "https://jsonplaceholder.typicode.com/posts"
         self.status_bar.showMessage("Загрузка данных...")
-        self.progress_bar.setValue(20)  # Установка значения прогресс бара
-        await asyncio.sleep(2)  # Имитация задержки
-        response = requests.get(url)
-        if response.status_code == 200:
-            self.progress_bar.setValue(50)  # Установка значения прогресс бара
-            data = response.json()
-            return data
-        else:
+        self.progress_bar.setValue(0)
+        try:
+            # Всегда перепроверяем у источника: иначе лента из кэша, более старая, чем
+            # посты от опроса обновлений, удалила бы их при синхронизации
+            pages = await fetch_all_json(POST_SOURCES, FETCH_CONCURRENCY, self.on_download_progress, max_age=0)
+        except (OSError, RuntimeError, ValueError):
             QMessageBox.warning(self, "Ошибка", "Не удалось загрузить данные")
             return []
+        self.progress_bar.setValue(50)  # Установка значения прогресс бара
+        return [post for page in pages for post in page]
+
+    def on_download_progress(self, received, total):
+        if total:
+            self.progress_bar.setValue(min(50, 50 * received // total))
+        self.status_bar.showMessage(f"Загрузка данных... {received / 1024:.0f} КБ")
+
+    # Задание уходит в поток записи, результат придёт в future по сигналу
+    def submit_write(self, kind, payload):
+        job_id = self.db_writer.submit(kind, payload)
+        future = asyncio.get_event_loop().create_future()
+        self.pending_writes[job_id] = future
+        return job_id, future
+
+    def on_write_finished(self, job_id, result):
+        future = self.pending_writes.pop(job_id, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+
+    def on_write_failed(self, job_id, message):
+        future = self.pending_writes.pop(job_id, None)
+        if future is not None and not future.done():
+            future.set_exception(sqlite3.Error(message))
+
+    # Вторая половина прогресс бара - реально зафиксированные пачки
+    def on_write_progress(self, job_id, done, total):
+        self.progress_bar.setValue(50 + 50 * done // total)
+        self.status_bar.showMessage(f"Сохранение данных... {done} из {total}")
+
+    def write_metrics(self):
+        stats = self.db_writer.stats()
+        return (f"Очередь записи: {stats['queue_depth']} (макс. {stats['queue_depth_max']}), "
+                f"транзакций: {stats['commits']}, фиксация: {stats['commit_time_avg'] * 1000:.1f} мс "
+                f"в среднем, {stats['commit_time_max'] * 1000:.1f} мс макс.")
 
     async def save_data_to_db(self, data):
         self.status_bar.showMessage("Сохранение данных...")
-        self.progress_bar.setValue(70)  # Установка значения прогресс бара
-        await asyncio.sleep(2)  # Имитация задержки
-        cursor = self.db_connection.cursor()
 
-        for item in data:
-            user_id = item.get('userId')  # Изменено на 'userId', так как API возвращает 'userId', а не 'user_id'
-            title = item.get('title')
-            body = item.get('body')
+        # Записываем только разницу с предыдущей загрузкой, а не все посты заново
+        posts = [item for item in data if item.get('userId') is not None]
+        job_id, future = self.submit_write("sync", posts)
+        try:
+            summary = await future
+        except asyncio.CancelledError:
+            self.db_writer.cancel(job_id)
+            raise
 
-            if user_id is not None:  # Проверяем, что user_id существует
-                # Вставляем запись, даже если она уже существует
-                cursor.execute("INSERT INTO posts (user_id, title, body) VALUES (?, ?, ?)",
-                               (user_id, title, body))
-
-        self.db_connection.commit()
         self.progress_bar.setValue(100)  # Установка значения прогресс бара
+        return summary
 
     async def load_data_task(self):
-        data = await self.fetch_data()
-        if data:
-            await self.save_data_to_db(data)
-            self.load_table_data()
-            self.status_bar.showMessage("Данные загружены и сохранены.", 5000)
-            self.progress_bar.setValue(0)  # Сброс значения прогресс бара
+        try:
+            data = await self.fetch_data()
+            if not data:
+                return
+            summary = await self.save_data_to_db(data)
+        except asyncio.CancelledError:
+            self.progress_bar.setValue(0)
+            self.status_bar.showMessage("Загрузка отменена", 5000)
+            raise
+        except sqlite3.Error as error:
+            self.progress_bar.setValue(0)
+            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить данные: {error}")
+            return
+        self.update_cursor = None  # Загрузка могла принести новые посты
+        # Таблица уже обновлена по сигналам rows_changed
+        self.status_bar.showMessage(
+            f"Данные синхронизированы: добавлено {summary.inserted}, изменено {summary.updated}, "
+            f"удалено {summary.deleted}. {self.write_metrics()}", 5000)
+        self.progress_bar.setValue(0)  # Сброс значения прогресс бара
 
     def load_data(self):
-        asyncio.create_task(self.load_data_task())
+        # Повторное нажатие отменяет незавершённую загрузку и начинает новую
+        if self.load_task is not None and not self.load_task.done():
+            self.load_task.cancel()
+        if self.update_task is not None and not self.update_task.done():
+            # Опрос не должен пересекаться с ручной загрузкой
+            self.update_task.cancel()
+            self.timer.start(self.update_interval)
+        self.load_task = asyncio.create_task(self.load_data_task())
 
     def add_record(self):
         dialog = AddRecordDialog(self)
@@ -161,41 +460,98 @@ class MainApp(QMainWindow):
             body = dialog.body_input.text()
 
             if user_id and title and body:  # Проверяем, что все поля заполнены
-                cursor = self.db_connection.cursor()
-                cursor.execute("INSERT INTO posts (user_id, title, body) VALUES (?, ?, ?)",
-                               (user_id, title, body))
-                self.db_connection.commit()  # Сохраняем изменения
-                self.load_table_data()  # Обновляем таблицу
+                asyncio.ensure_future(self.insert_record((user_id, title, body)))
             else:
                 QMessageBox.warning(self, "Ошибка", "Все поля должны быть заполнены.")
 
+    async def insert_record(self, row):
+        try:
+            await self.submit_write("insert", row)[1]
+        except sqlite3.Error as error:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось добавить запись: {error}")
+
     def delete_record(self):
         selected_indexes = self.table_view.selectionModel().selectedRows()
         if not selected_indexes:
             QMessageBox.warning(self, "Удаление записи", "Выберите запись для удаления.")
             return
 
-        confirm = QMessageBox.question(self, "Удаление записи", "Удалить выбранную запись?",
+        confirm = QMessageBox.question(self, "Удаление записи",
+                                       f"Удалить выбранные записи ({len(selected_indexes)})?",
                                        QMessageBox.Yes | QMessageBox.No)
         if confirm == QMessageBox.Yes:
-            row = selected_indexes[0].row()
-            record_id = int(self.model.item(row, 0).text())
-            cursor = self.db_connection.cursor()
-            cursor.execute("DELETE FROM posts WHERE id = ?", (record_id,))
-            self.db_connection.commit()
-            self.load_table_data()
-            QMessageBox.information(self, "Удаление записи", "Запись успешно удалена.")
+            # Все выбранные строки удаляются одной транзакцией в потоке записи
+            rows = sorted(index.row() for index in selected_indexes)
+            record_ids = [record_id for record_id in map(self.model.record_id, rows) if record_id is not None]
+            asyncio.ensure_future(self.remove_records(record_ids))
+
+    async def remove_records(self, record_ids):
+        try:
+            deleted = await self.submit_write("delete", record_ids)[1]
+        except sqlite3.Error as error:
+            QMessageBox.warning(self, "Удаление записи", f"Не удалось удалить записи: {error}")
+            return
+        QMessageBox.information(self, "Удаление записи", f"Удалено записей: {deleted}.")
 
     def check_updates(self):
-        asyncio.create_task(self.fetch_updates())
+        # Пока идёт ручная загрузка, опрос откладывается до следующего срабатывания
+        if self.load_task is not None and not self.load_task.done():
+            self.timer.start(self.update_interval)
+            return
+        self.update_task = asyncio.ensure_future(self.fetch_updates())
 
+    # У источника запрашиваются только посты новее курсора, условным запросом
+    # (If-None-Match): если ничего не появилось, проверка стоит одного ответа 304
+    # и не трогает ни БД, ни интерфейс. Новые посты дописываются через поток записи,
+    # таблица получает только изменённые строки. Следующая проверка планируется при
+    # любом исходе, кроме отмены: отменивший опрос сам распоряжается таймером.
     async def fetch_updates(self):
-        # Имитация проверки обновлений
-        await asyncio.sleep(1)
-        self.status_bar.showMessage("Проверка обновлений завершена.", 5000)
+        changed = False
+        cancelled = False
+        try:
+            if self.update_cursor is None:
+                self.update_cursor = sync_watermark(self.db.reader())
+            urls = [updates_url(url, self.update_cursor) for url in POST_SOURCES]
+            pages = await fetch_all_json(urls, FETCH_CONCURRENCY, max_age=0)
+            posts = [post for page in pages for post in page if post.get('userId') is not None]
+            if posts:
+                summary = await self.submit_write("merge", posts)[1]
+                self.update_cursor = max(self.update_cursor, max(post['id'] for post in posts))
+                changed = summary.inserted + summary.updated > 0
+                if changed:
+                    self.status_bar.showMessage(
+                        f"Получены обновления: новых {summary.inserted}, изменённых {summary.updated}.", 5000)
+        except asyncio.CancelledError:
+            cancelled = True
+            raise
+        except (OSError, RuntimeError, ValueError, sqlite3.Error):
+            pass  # Источник недоступен - следующая проверка будет позже
+        except Exception as error:
+            traceback.print_exc()
+            self.status_bar.showMessage(f"Ошибка проверки обновлений: {error}", 5000)
+        finally:
+            if not cancelled:
+                self.schedule_updates(changed)
+
+    def schedule_updates(self, changed):
+        if changed:
+            self.update_interval = max(UPDATE_INTERVAL_MIN, self.update_interval // 2)
+        else:
+            self.update_interval = min(UPDATE_INTERVAL_MAX, self.update_interval * 3 // 2)
+        self.timer.start(self.update_interval)
 
     def closeEvent(self, event):
-        self.db_connection.close()
+        if self.load_task is not None and not self.load_task.done():
+            self.load_task.cancel()
+        if self.update_task is not None and not self.update_task.done():
+            self.update_task.cancel()
+        if self.index_task is not None:
+            self.index_task.cancel()
+        self.timer.stop()
+        if self.db_writer is not None:
+            self.db_writer.cancel_syncs()  # Иначе stop() дождался бы сохранения всей ленты
+            self.db_writer.stop()  # Поставленные правки дописываются до закрытия БД
+        self.db.close()
         super().closeEvent(event)
 
 
@@ -222,6 +578,7 @@ class AddRecordDialog(QDialog):
 
 
 if __name__ == "__main__":
+    startup.mark("импорт модулей")
     app = QApplication(sys.argv)
 
     # Настройка интеграции asyncio и PyQt
@@ -230,6 +587,9 @@ if __name__ == "__main__":
 
     # Запуск приложения
     with loop:
+        startup.mark("QApplication и цикл событий")
         main_app = MainApp()
+        startup.mark("окно создано")
         main_app.show()
+        startup.report_after_first_paint(main_app, app)
         loop.run_forever()
\ No newline at end of file
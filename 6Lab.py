@@ -1,9 +1,44 @@
 import sys
-import pandas as pd
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QComboBox, QLabel, QLineEdit, QHBoxLayout
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+import startup
+startup.start()  # --profile-startup: перехват импортов должен стоять до остальных модулей
+
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QFileDialog, QComboBox, QLabel, QLineEdit, QHBoxLayout, QProgressDialog
+
+# pandas и matplotlib загружаются почти секунду, поэтому импортируются при первом
+# использовании (загрузка файла, первый график), а не при запуске
+
+
+# Загрузка CSV в отдельном потоке: файл читается пачками в колоночный кэш рядом
+# с ним (data_engine), повторное открытие того же файла берёт данные из кэша
+class CsvLoader(QThread):
+    progress = pyqtSignal(int)  # проценты
+    loaded = pyqtSignal(object, object)  # таблица и её статистика (data_engine.DataStats)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file_path, parent=None):
+        super().__init__(parent)
+        self.file_path = file_path
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def report(self, done, total):
+        self.progress.emit(100 * done // total if total else 100)
+
+    def run(self):
+        from data_engine import DataStats, LoadCancelled, load_csv
+        try:
+            data = load_csv(self.file_path, self.report, lambda: self.cancelled)
+            stats = DataStats.from_frame(data)
+        except LoadCancelled:
+            return
+        except (OSError, ValueError) as error:
+            self.failed.emit(str(error))
+            return
+        self.loaded.emit(data, stats)
+
 
 class DataAnalysisApp(QWidget):
     def __init__(self):
@@ -14,6 +49,9 @@ class DataAnalysisApp(QWidget):
 
         # Переменная для хранения данных
         self.data = None
+        self.store = None  # Буферы столбцов для дозаписи (data_engine.ColumnStore); self.data - их представление
+        self.stats = None  # Статистика self.data, обновляется при добавлении строк
+        self.loader = None
 
     def initUI(self):
         # Основной layout
@@ -26,6 +64,7 @@ class DataAnalysisApp(QWidget):
 
         # Метка для отображения статистики
         self.stats_label = QLabel('Статистика данных', self)
+        self.stats_label.setWordWrap(True)  # Длинные строки статистики не расширяют окно
         layout.addWidget(self.stats_label)
 
         # Комбо-бокс для выбора типа графика
@@ -36,14 +75,17 @@ class DataAnalysisApp(QWidget):
         self.chart_type.currentIndexChanged.connect(self.plot_data)  # Обновляем график при изменении выбора
         layout.addWidget(self.chart_type)
 
-        # Поле для отображения графиков
-        self.canvas = FigureCanvas(Figure(figsize=(8, 6)))
-        layout.addWidget(self.canvas)
+        # Поле для отображения графиков; холст matplotlib и кэш графиков (charts.ChartCache)
+        # создаются при первом графике
+        self.canvas = None
+        self.charts = None
+        self.canvas_area = QVBoxLayout()
+        layout.addLayout(self.canvas_area, 1)
 
         # Добавление нового значения
         input_layout = QHBoxLayout()
         self.new_value_input = QLineEdit(self)
-        self.new_value_input.setPlaceholderText('Введите новое значение (Date, Value1, Value2)')
+        self.new_value_input.setPlaceholderText('Введите новое значение (Date, Value1, Value2); несколько строк - через ;')
         input_layout.addWidget(self.new_value_input)
 
         self.add_button = QPushButton('Добавить новое значение', self)
@@ -55,6 +97,20 @@ class DataAnalysisApp(QWidget):
         # Установка главного layout
         self.setLayout(layout)
         self.setWindowTitle('Анализ данных')
+        self.resize(800, 750)
+
+    def ensure_canvas(self):
+        if self.canvas is None:
+            from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+            self.canvas = FigureCanvas(Figure(figsize=(8, 6)))
+            # Панель масштабирования и сдвига графика
+            self.canvas_area.addWidget(NavigationToolbar2QT(self.canvas, self))
+            self.canvas_area.addWidget(self.canvas)
+            from charts import ChartCache
+            self.charts = ChartCache(self.canvas)
+        return self.canvas
 
     def load_data(self):
         # Загрузка CSV файла
@@ -62,100 +118,140 @@ class DataAnalysisApp(QWidget):
         file_path, _ = QFileDialog.getOpenFileName(self, "Загрузить CSV", "", "CSV Files (*.csv)", options=options)
 
         if file_path:
-            self.data = pd.read_csv(file_path)
-
-            # Отображаем статистику по данным
-            stats = self.get_data_stats()
-            self.stats_label.setText(stats)
-
-            # Визуализируем данные
-            self.plot_data()
+            if self.loader is not None:
+                # Два загрузчика одного файла не должны писать кэш одновременно
+                self.loader.cancel()
+                self.loader.wait()
+            self.loader = CsvLoader(file_path, self)
+            dialog = QProgressDialog('Загрузка данных...', 'Отмена', 0, 100, self)
+            dialog.setWindowModality(Qt.WindowModal)
+            dialog.setMinimumDuration(500)  # Открытие из кэша обходится без окна прогресса
+            dialog.canceled.connect(self.loader.cancel)
+            self.loader.progress.connect(dialog.setValue)
+            self.loader.loaded.connect(self.on_data_loaded)
+            self.loader.failed.connect(lambda message: self.stats_label.setText(f'Ошибка загрузки: {message}'))
+            self.loader.finished.connect(dialog.reset)
+            self.loader.start()
+
+    def on_data_loaded(self, data, stats):
+        if self.sender() is not self.loader:
+            return  # Результат отменённой загрузки
+        from data_engine import ColumnStore
+        self.store = ColumnStore.from_frame(data)
+        self.data = data
+        self.stats = stats
+        self.ensure_canvas()
+        self.charts.reset(data)
+
+        # Отображаем статистику по данным
+        stats = self.get_data_stats()
+        self.stats_label.setText(stats)
+
+        # Визуализируем данные
+        self.plot_data()
 
     def get_data_stats(self):
-        # Статистика: количество строк и столбцов, минимальные и максимальные значения
-        if self.data is not None:
-            stats = f'Строк: {len(self.data)}\nСтолбцов: {len(self.data.columns)}\n'
-            stats += f'Минимальные значения:\n{self.data.min()}\n'
-            stats += f'Максимальные значения:\n{self.data.max()}'
-            return stats
-        return 'Данные не загружены'
+        # Статистика: количество строк и столбцов, минимальные и максимальные значения,
+        # среднее и стандартное отклонение, квартили и число различных значений.
+        # Берётся из self.stats, а не пересчитывается по таблице; квартили и число
+        # различных для больших столбцов - оценки (отмечены ~). По строке на столбец,
+        # чтобы метка не отнимала место у графика
+        if self.stats is None:
+            return 'Данные не загружены'
+        columns = self.stats.columns
+        stats = f'Строк: {self.stats.rows}, столбцов: {len(columns)}'
+        for name, column in columns.items():
+            stats += f'\n{name}: ' + self.format_column_stats(column)
+        return stats
+
+    def format_column_stats(self, column):
+        def value(v):
+            if isinstance(v, float):
+                return f'{v:.6g}'
+            return str(v.date()) if hasattr(v, 'date') and v == v.normalize() else str(v)
+
+        if column.count == 0:
+            return 'нет значений'
+        parts = [f'мин {value(column.minimum)}, макс {value(column.maximum)}']
+        if column.variance is not None:
+            parts.append(f'среднее {column.mean:.6g} ± {column.variance ** 0.5:.6g}')
+        quartiles = column.quantiles()
+        if quartiles is not None:
+            parts.append('квартили ' + ('' if column.quantile_sketch.exact else '~')
+                         + ' / '.join(f'{q:.4g}' for q in quartiles))
+        parts.append(f'различных {"" if column.kind == "category" else "~"}{column.distinct}')
+        return '; '.join(parts)
 
     def plot_data(self):
         if self.data is not None:
-            # Очистка предыдущего графика
-            self.canvas.figure.clf()
-
-            # Получаем тип графика
-            chart_type = self.chart_type.currentText()
-
-            # Создаем новый график
-            ax = self.canvas.figure.add_subplot(111)
-
-            if chart_type == 'Линейный график':
-                # Убедимся, что столбцы 'Date' и 'Value1' существуют
-                if 'Date' in self.data.columns and 'Value1' in self.data.columns:
-                    ax.plot(self.data['Date'], self.data['Value1'])
-                    ax.set_title('Линейный график')
-                    ax.set_xlabel('Date')
-                    ax.set_ylabel('Value1')
-
-                    # Уменьшаем частоту отображения меток оси X
-                    date_labels = self.data['Date']
-                    step = len(date_labels) // 6  # Показываем 6 меток на оси X
-                    ax.set_xticks(date_labels[::step])  # Отображаем метки через 'step'
-
-                    # Поворот меток оси X для улучшения читаемости
-                    plt.xticks(rotation=45)
-
-            elif chart_type == 'Гистограмма':
-                # Убедимся, что столбец 'Value2' существует
-                if 'Value2' in self.data.columns:
-                    ax.hist(self.data['Value2'], bins=20)
-                    ax.set_title('Гистограмма')
-                    ax.set_xlabel('Value2')
-                    ax.set_ylabel('Частота')
-
-            elif chart_type == 'Круговая диаграмма':
-                # Убедимся, что столбец 'Category' существует
-                if 'Category' in self.data.columns:
-                    category_counts = self.data['Category'].value_counts()
-                    ax.pie(category_counts, labels=category_counts.index, autopct='%1.1f%%')
-                    ax.set_title('Круговая диаграмма')
-
-            # Обновляем отображение
-            self.canvas.draw()
+            # График выбранного типа из кэша: агрегаты и элементы уже построенного
+            # типа не пересчитываются, а холст восстанавливается из снимка
+            self.ensure_canvas()
+            self.charts.show(self.chart_type.currentText())
 
     def add_new_value(self):
         # Получаем ввод от пользователя
         new_value = self.new_value_input.text()
 
         if new_value:
-            # Преобразуем ввод в список значений
-            values = new_value.split(',')
-
-            if len(values) == 3:  # Ожидаем 3 значения для Date, Value1 и Value2
-                new_data = {
-                    'Date': [values[0].strip()],
-                    'Value1': [float(values[1].strip())],
-                    'Value2': [float(values[2].strip())]
-                }
-
-                new_df = pd.DataFrame(new_data)
-
-                # Добавляем новые данные в существующий DataFrame
-                self.data = pd.concat([self.data, new_df], ignore_index=True)
-
-                # Обновляем график
-                self.plot_data()
+            # Преобразуем ввод в столбцы; строки (вставленные или набранные) разделяются ; или переводом строки
+            new_data = {'Date': [], 'Value1': [], 'Value2': []}
+            try:
+                for line in new_value.replace('\n', ';').split(';'):
+                    if not line.strip():
+                        continue
+                    values = line.split(',')
+                    if len(values) != 3:  # Ожидаем 3 значения для Date, Value1 и Value2
+                        raise ValueError(line)
+                    new_data['Date'].append(values[0].strip())
+                    new_data['Value1'].append(float(values[1].strip()))
+                    new_data['Value2'].append(float(values[2].strip()))
+
+                # Дозапись в буферы столбцов без копирования таблицы; типы - как у загруженных столбцов
+                if self.store is None:
+                    from data_engine import ColumnStore
+                    self.store = ColumnStore()
+                added = self.store.append(new_data)
+            except ValueError:
+                self.stats_label.setText('Введите данные в формате: Date, Value1, Value2')
+                return
+
+            if len(added):
+                self.data = self.store.frame()
+
+                # Статистика обновляется по добавленным строкам, без прохода по таблице
+                if self.stats is None:
+                    from data_engine import DataStats
+                    self.stats = DataStats()
+                if len(added) == 1:
+                    self.stats.append(added.iloc[0].to_dict())
+                else:
+                    self.stats.extend(added)
+                self.stats_label.setText(self.get_data_stats())
+
+                # Обновляем графики по добавленным строкам
+                self.ensure_canvas()
+                if self.charts.data is None:
+                    self.charts.reset(self.data)
+                    self.plot_data()
+                else:
+                    self.charts.append(self.data, added)
 
                 # Очищаем поле ввода
                 self.new_value_input.clear()
 
-            else:
-                self.stats_label.setText('Введите данные в формате: Date, Value1, Value2')
+    def closeEvent(self, event):
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader.wait()
+        super().closeEvent(event)
 
 if __name__ == '__main__':
+    startup.mark('импорт модулей')
     app = QApplication(sys.argv)
+    startup.mark('QApplication')
     ex = DataAnalysisApp()
+    startup.mark('окно создано')
     ex.show()
+    startup.report_after_first_paint(ex, app)
     sys.exit(app.exec_())
@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+from http_cache import get_default_cache
+
+
+class FetchCancelled(Exception):
+    pass
+
+
+# Неблокирующая загрузка JSON из нескольких источников (страниц или шардов одной
+# коллекции). Сетевой ввод-вывод выполняется в пуле потоков через run_in_executor,
+# так что цикл событий (и интерфейс на asyncqt) не замирает. Одновременно идёт не
+# больше concurrency запросов. progress(received, total) вызывается в потоке цикла
+# событий с суммой байт по всем источникам; total - None, пока размер известен не
+# для всех. Отмена задачи прерывает и уже идущие загрузки на границе куска.
+# max_age передаётся в ResponseCache.get (0 - условный запрос даже для свежей записи).
+# Возвращает список разобранных ответов в порядке urls; ошибка HTTP -> RuntimeError.
+async def fetch_all_json(urls, concurrency=4, progress=None, cache=None, max_age=None):
+    loop = asyncio.get_running_loop()
+    cache = cache or get_default_cache()
+    semaphore = asyncio.Semaphore(concurrency)
+    cancelled = threading.Event()
+    sizes = {url: (0, None) for url in urls}
+
+    def report():
+        received = sum(done for done, _ in sizes.values())
+        totals = [total for _, total in sizes.values()]
+        progress(received, None if None in totals else sum(totals))
+
+    def download(url):
+        def on_chunk(received, total):
+            if cancelled.is_set():
+                raise FetchCancelled(url)
+            if progress is not None:
+                sizes[url] = (received, total)
+                loop.call_soon_threadsafe(report)
+
+        response = cache.get(url, progress=on_chunk, max_age=max_age)
+        if progress is not None:
+            # Ответ из кэша или 304: источник загружен целиком
+            received = sizes[url][0]
+            sizes[url] = (received, received)
+            loop.call_soon_threadsafe(report)
+        if response.status_code != 200:
+            raise RuntimeError(f"Ошибка при получении данных {url}: {response.status_code}")
+        return response.json()
+
+    async def fetch_one(url):
+        async with semaphore:
+            return await loop.run_in_executor(None, download, url)
+
+    try:
+        return await asyncio.gather(*(fetch_one(url) for url in urls))
+    except BaseException:
+        cancelled.set()
+        raise
@@ -0,0 +1,300 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from data_engine import LinePyramid, date_label
+
+LINE = 'Линейный график'
+HISTOGRAM = 'Гистограмма'
+PIE = 'Круговая диаграмма'
+
+HISTOGRAM_BINS = 20
+
+# Параметры ax.pie; PieChart повторяет по ним раскладку подписей при обновлении
+PIE_AUTOPCT = '%1.1f%%'
+PIE_LABEL_DISTANCE = 1.1
+PIE_PCT_DISTANCE = 0.6
+
+# Что нужно сделать с холстом после добавления строк в график
+REDRAW = 'redraw'  # изменились оси или подписи - полная отрисовка
+BLIT = 'blit'      # изменились только отдельные элементы внутри осей
+
+
+# График одного типа на своих осях. build() считает агрегаты по всей таблице и
+# создаёт элементы графика; append() обновляет их по добавленным строкам и
+# возвращает None (ничего не изменилось), REDRAW или (BLIT, список элементов).
+# erase - при blit элементы рисуются на снимке холста без них (они не только
+# растут, но и сдвигаются, и поверх старого снимка остались бы прежние).
+class Chart(ABC):
+    columns = ()
+    erase = False
+
+    def __init__(self, canvas, data):
+        self.canvas = canvas
+        self.ax = canvas.figure.add_subplot(111)
+        self.data = data
+        self.built = False
+        self.build()
+
+    def build(self):
+        self.ax.cla()
+        self.built = all(column in self.data.columns for column in self.columns)
+        if self.built:
+            self.draw()
+
+    @abstractmethod
+    def draw(self):
+        pass
+
+    def append(self, data, added):
+        self.data = data
+        if not self.built:
+            self.build()
+            return REDRAW if self.built else None
+        return self.update(added)
+
+    @abstractmethod
+    def update(self, added):
+        pass
+
+    def close(self):
+        pass
+
+
+# Линия по номерам строк, прореженная пирамидой min/max (data_engine.LinePyramid):
+# на каждую ширину экрана в пикселях берутся минимум и максимум, при масштабировании
+# и сдвиге прореживается заново только видимый диапазон. Ось X подписывается датами
+# соответствующих строк, не больше 6 меток. Добавленные строки дописываются в пирамиду,
+# но холст перерисовывается целиком: с каждой строкой меняются пределы оси X и
+# подписи дат, а они лежат вне области осей и входят в снимок фона, так что blit
+# здесь ничего не экономит.
+class LineChart(Chart):
+    column = 'Value1'
+    columns = ('Date', column)
+
+    def __init__(self, canvas, data):
+        self.resize_handler = None
+        super().__init__(canvas, data)
+
+    def draw(self):
+        from matplotlib.ticker import FuncFormatter, MaxNLocator
+
+        ax = self.ax
+        self.pyramid = LinePyramid(self.data[self.column].to_numpy())
+        self.line, = ax.plot([], [])
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=6, integer=True))
+        ax.xaxis.set_major_formatter(FuncFormatter(lambda value, pos: date_label(self.data['Date'], value)))
+        ax.callbacks.connect('xlim_changed', self.redecimate)
+        self.fit()  # Подписка раньше fit: его set_xlim и прореживает линию в первый раз
+        if self.resize_handler is None:
+            self.resize_handler = self.canvas.mpl_connect('resize_event', lambda event: self.redecimate(ax))
+        ax.set_title(LINE)
+        ax.set_xlabel('Date')
+        ax.set_ylabel(self.column)
+
+        # Поворот меток оси X для улучшения читаемости
+        ax.tick_params(axis='x', labelrotation=45)
+
+    def redecimate(self, ax):
+        start, stop = ax.get_xlim()
+        width = int(ax.get_window_extent().width)
+        self.line.set_data(*self.pyramid.query(int(start), int(stop) + 2, width))
+
+    # Весь диапазон строк и значений
+    def fit(self):
+        value_range = self.pyramid.value_range()
+        if value_range is not None:
+            low, high = value_range
+            margin = (high - low) * 0.05 or 1
+            self.ax.set_ylim(low - margin, high + margin)
+        self.ax.set_xlim(0, max(len(self.pyramid) - 1, 1))  # xlim_changed прореживает линию
+
+    def update(self, added):
+        self.pyramid.update(self.data[self.column].to_numpy())
+        self.fit()
+        return REDRAW  # Сдвинулись границы и подписи оси X
+
+    def close(self):
+        if self.resize_handler is not None:
+            self.canvas.mpl_disconnect(self.resize_handler)
+
+
+# Гистограмма по HISTOGRAM_BINS корзинам в диапазоне значений. Добавленные значения
+# внутри диапазона увеличивают счётчики своих корзин (перерисовываются только
+# изменившиеся столбики); значение вне диапазона сдвигает корзины - пересчёт по столбцу.
+class HistogramChart(Chart):
+    column = 'Value2'
+    columns = (column,)
+
+    def draw(self):
+        values = self.data[self.column].to_numpy()
+        self.counts, self.edges = np.histogram(values[~np.isnan(values)], bins=HISTOGRAM_BINS)
+        _, _, self.bars = self.ax.hist(self.edges[:-1], bins=self.edges, weights=self.counts)
+        self.ax.set_title(HISTOGRAM)
+        self.ax.set_xlabel(self.column)
+        self.ax.set_ylabel('Частота')
+
+    def update(self, added):
+        if self.column not in added:
+            return None
+        values = added[self.column].to_numpy()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return None
+        if values.min() < self.edges[0] or values.max() > self.edges[-1]:
+            self.build()
+            return REDRAW
+
+        # Правая граница последней корзины входит в неё, как в np.histogram
+        bins = np.minimum(np.searchsorted(self.edges, values, side='right') - 1, HISTOGRAM_BINS - 1)
+        changed = np.unique(bins)
+        self.counts += np.bincount(bins, minlength=HISTOGRAM_BINS)
+        for i in changed:
+            self.bars[i].set_height(self.counts[i])
+        if self.counts.max() > self.ax.get_ylim()[1]:
+            self.ax.relim()
+            self.ax.autoscale_view()
+            return REDRAW
+        return BLIT, [self.bars[i] for i in changed]
+
+
+# Круговая диаграмма по счётчикам категорий; добавленные строки прибавляются к
+# счётчикам, диаграмма строится из них без прохода по столбцу. Без новых категорий
+# секторы и подписи сдвигаются на месте (set_theta1/set_theta2, позиции и тексты
+# как в ax.pie) и перерисовываются через blit; новая категория - построение заново.
+class PieChart(Chart):
+    column = 'Category'
+    columns = (column,)
+    erase = True
+
+    def draw(self):
+        self.counts = self.data[self.column].value_counts()
+        self.draw_pie()
+
+    def draw_pie(self):
+        self.wedges, self.labels, self.pcts = self.ax.pie(
+            self.counts, labels=self.counts.index, autopct=PIE_AUTOPCT,
+            labeldistance=PIE_LABEL_DISTANCE, pctdistance=PIE_PCT_DISTANCE)
+        self.ax.set_title(PIE)
+
+    def update(self, added):
+        if self.column not in added:
+            return None
+        counts = added[self.column].value_counts()
+        counts = counts[counts > 0]
+        if not len(counts):
+            return None
+        if len(counts.index.difference(self.counts.index)):
+            self.counts = self.counts.add(counts, fill_value=0).astype(int).sort_values(ascending=False, kind='stable')
+            self.ax.cla()
+            self.draw_pie()
+            return REDRAW
+
+        # Порядок секторов сохраняется, меняются только их доли
+        self.counts = self.counts + counts.reindex(self.counts.index, fill_value=0)
+        theta1 = 0.0
+        for wedge, label, pct, frac in zip(self.wedges, self.labels, self.pcts,
+                                           self.counts.to_numpy() / self.counts.sum()):
+            theta2 = theta1 + frac
+            wedge.set_theta1(360 * theta1)
+            wedge.set_theta2(360 * theta2)
+            x, y = np.cos(np.pi * (theta1 + theta2)), np.sin(np.pi * (theta1 + theta2))
+            label.set_position((PIE_LABEL_DISTANCE * x, PIE_LABEL_DISTANCE * y))
+            label.set_horizontalalignment('left' if x > 0 else 'right')
+            pct.set_position((PIE_PCT_DISTANCE * x, PIE_PCT_DISTANCE * y))
+            pct.set_text(PIE_AUTOPCT % (100 * frac))
+            theta1 = theta2
+        return BLIT, self.wedges + self.labels + self.pcts
+
+
+CHART_CLASSES = {LINE: LineChart, HISTOGRAM: HistogramChart, PIE: PieChart}
+
+
+# Кэш графиков 6Lab: для каждого уже показанного типа - свои оси с готовыми
+# элементами и агрегатами, плюс снимок отрисованного холста. Переключение на
+# показанный тип без изменений восстанавливает снимок (restore_region + blit)
+# без отрисовки; добавление строк обновляет агрегаты всех построенных графиков,
+# а видимый перерисовывается целиком, только если изменились оси (иначе blit).
+# Для графиков с erase хранится ещё снимок без их элементов: он снимается одной
+# полной отрисовкой со скрытыми элементами и живёт, пока не изменится размер холста.
+class ChartCache:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.charts = {}
+        self.backgrounds = {}  # тип -> (снимок холста, размер холста)
+        self.clean = {}  # тип -> (снимок холста без элементов графика, размер холста)
+        self.current = None
+        self.data = None
+        canvas.mpl_connect('draw_event', self.remember)
+
+    # Новые данные: все графики строятся заново при показе
+    def reset(self, data):
+        for chart in self.charts.values():
+            chart.close()
+        self.canvas.figure.clf()
+        self.charts = {}
+        self.backgrounds = {}
+        self.clean = {}
+        self.current = None
+        self.data = data
+
+    def show(self, chart_type):
+        chart = self.charts.get(chart_type)
+        if chart is None:
+            chart = self.charts[chart_type] = CHART_CLASSES[chart_type](self.canvas, self.data)
+        self.current = chart_type
+        for other in self.charts.values():
+            other.ax.set_visible(other is chart)
+
+        background = self.backgrounds.get(chart_type)
+        if background is not None and background[1] == self.size():
+            self.canvas.restore_region(background[0])
+            self.canvas.blit(self.canvas.figure.bbox)
+        else:
+            self.canvas.draw()
+
+    def append(self, data, added):
+        self.data = data
+        for chart_type, chart in self.charts.items():
+            result = chart.append(data, added)
+            if result is None:
+                continue
+            if result == REDRAW:
+                self.clean.pop(chart_type, None)
+            if chart_type != self.current:
+                self.backgrounds.pop(chart_type, None)  # Перерисуется при показе
+            elif result == REDRAW:
+                self.canvas.draw()
+            else:
+                self.blit(chart, result[1])
+
+    def blit(self, chart, artists):
+        background = self.backgrounds.get(self.current)
+        if background is None or background[1] != self.size():
+            self.canvas.draw()
+            return
+        if chart.erase:
+            background = self.clean.get(self.current)
+            if background is None or background[1] != self.size():
+                background = self.clean[self.current] = self.snapshot_without(artists)
+        self.canvas.restore_region(background[0])
+        for artist in artists:
+            chart.ax.draw_artist(artist)
+        self.canvas.blit(self.canvas.figure.bbox)  # Подписи могут выходить за оси
+        self.remember()
+
+    def snapshot_without(self, artists):
+        for artist in artists:
+            artist.set_visible(False)
+        self.canvas.draw()
+        snapshot = (self.canvas.copy_from_bbox(self.canvas.figure.bbox), self.size())
+        for artist in artists:
+            artist.set_visible(True)
+        return snapshot
+
+    def size(self):
+        return self.canvas.get_width_height()
+
+    def remember(self, event=None):
+        if self.current is not None:
+            self.backgrounds[self.current] = (self.canvas.copy_from_bbox(self.canvas.figure.bbox), self.size())
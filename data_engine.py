@@ -0,0 +1,764 @@
+import os
+import json
+import hashlib
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Столбцы, которые используют графики и статистика 6Lab; остальные не читаются
+USED_COLUMNS = ("Date", "Value1", "Value2", "Category")
+FLOAT_COLUMNS = ("Value1", "Value2")
+
+READ_DTYPES = {"Date": str, "Value1": "float32", "Value2": "float32", "Category": "category"}
+
+CACHE_VERSION = 1
+CHUNK_ROWS = 200000
+
+
+class LoadCancelled(Exception):
+    pass
+
+
+# Дата в очередной пачке не разобралась, хотя в первой разбиралась целиком
+class _DatesNotParsed(Exception):
+    pass
+
+
+# Колоночный кэш CSV: каталог <файл>.cache рядом с CSV, по одному сырому двоичному
+# файлу на столбец (float32, datetime64[ns] или коды категорий int32) и meta.json
+# с размером и временем изменения исходного файла. meta.json пишется последним,
+# так что недописанный кэш считается устаревшим. Столбцы открываются через
+# np.memmap: повторное открытие не читает данные, их подкачивает ОС по мере нужды.
+def cache_dir_for(path):
+    return path + ".cache"
+
+
+# Кэш для CSV в каталоге без права записи: постоянное имя во временном каталоге
+# по полному пути файла, чтобы следующий запуск нашёл его, а не строил новый
+def temp_cache_dir_for(path):
+    key = hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), "6lab-" + key)
+
+
+def _source_stamp(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _open_column(cache_dir, column, rows):
+    path = os.path.join(cache_dir, column["file"])
+    dtype = np.dtype(column["dtype"])
+    if rows == 0:
+        values = np.empty(0, dtype)
+    else:
+        values = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+    if column["kind"] == "category":
+        return pd.Series(pd.Categorical.from_codes(values, categories=column["categories"], ordered=True),
+                         name=column["name"])
+    return pd.Series(values, name=column["name"], copy=False)
+
+
+def open_cache(cache_dir):
+    meta = _read_meta(cache_dir)
+    rows = meta["rows"]
+    series = {column["name"]: _open_column(cache_dir, column, rows) for column in meta["columns"]}
+    return pd.DataFrame(series, copy=False)
+
+
+def _cache_is_fresh(path, cache_dir):
+    meta = _read_meta(cache_dir)
+    return (meta is not None and meta.get("version") == CACHE_VERSION
+            and meta.get("source") == _source_stamp(path))
+
+
+# Столбец с инкрементальным словарём категорий: коды пишутся в файл по мере чтения,
+# а в конце категории сортируются и коды переписываются под сортированный порядок
+# (упорядоченная категория даёт те же min/max, что и исходные строки)
+class _CategoryWriter:
+    kind = "category"
+    dtype = np.dtype("int32")
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        self.codes = {}
+        self.file = open(path, "wb")
+
+    def write(self, values):
+        values = values.astype("category").cat
+        # Коды пачки переводятся в общие через таблицу размером с число категорий
+        lookup = np.empty(len(values.categories) + 1, dtype=self.dtype)
+        lookup[-1] = -1
+        for chunk_code, value in enumerate(values.categories):
+            lookup[chunk_code] = self.codes.setdefault(value, len(self.codes))
+        lookup[values.codes.to_numpy()].tofile(self.file)
+
+    def finish(self, rows):
+        self.file.close()
+        categories = sorted(self.codes, key=str)
+        if rows:
+            order = np.empty(len(categories) + 1, dtype=self.dtype)
+            order[-1] = -1  # код -1 (пропуск) остаётся -1
+            for new_code, value in enumerate(categories):
+                order[self.codes[value]] = new_code
+            codes = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(rows,))
+            for start in range(0, rows, CHUNK_ROWS):
+                codes[start:start + CHUNK_ROWS] = order[codes[start:start + CHUNK_ROWS]]
+            codes.flush()
+            del codes
+        return {"categories": [str(value) for value in categories]}
+
+
+class _ArrayWriter:
+    def __init__(self, name, path, kind, dtype):
+        self.name = name
+        self.kind = kind
+        self.dtype = np.dtype(dtype)
+        self.file = open(path, "wb")
+
+    def write(self, values):
+        if self.kind == "datetime":
+            parsed = pd.to_datetime(values, errors="coerce")
+            if parsed.isna().sum() != values.isna().sum():
+                raise _DatesNotParsed(self.name)
+            values = parsed
+        np.asarray(values, dtype=self.dtype).tofile(self.file)
+
+    def finish(self, rows):
+        self.file.close()
+        return {}
+
+
+def _make_writer(name, first_chunk, cache_dir, text_dates=False):
+    path = os.path.join(cache_dir, name + ".bin")
+    if name in FLOAT_COLUMNS:
+        return _ArrayWriter(name, path, "float", "float32")
+    if name == "Date" and not text_dates:
+        # Дата хранится как datetime64, если первая пачка разбирается целиком;
+        # иначе - как упорядоченная категория строк. Если целиком не разберётся
+        # одна из следующих пачек, кэш строится заново с датами-строками.
+        values = first_chunk[name]
+        if pd.to_datetime(values, errors="coerce").isna().sum() == values.isna().sum():
+            return _ArrayWriter(name, path, "datetime", "datetime64[ns]")
+    return _CategoryWriter(name, path)
+
+
+# Чтение CSV пачками по chunk_rows строк прямо в колоночный кэш, так что в памяти
+# одновременно только одна пачка. Числа и категории разбирает сразу парсер CSV
+# (float32 и category), даты - to_datetime. progress(прочитано байт, размер файла);
+# cancelled() проверяется между пачками и прерывает загрузку (LoadCancelled).
+def build_cache(path, cache_dir, progress=None, cancelled=None, chunk_rows=CHUNK_ROWS, text_dates=False):
+    os.makedirs(cache_dir, exist_ok=True)
+    meta_path = os.path.join(cache_dir, "meta.json")
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    total = os.path.getsize(path)
+    writers = None
+    rows = 0
+    dates_failed = False
+    with open(path, "rb") as f:
+        reader = pd.read_csv(f, usecols=lambda name: name in USED_COLUMNS, chunksize=chunk_rows,
+                             dtype=READ_DTYPES)
+        try:
+            for chunk in reader:
+                if cancelled is not None and cancelled():
+                    raise LoadCancelled(path)
+                if writers is None:
+                    writers = [_make_writer(name, chunk, cache_dir, text_dates)
+                               for name in USED_COLUMNS if name in chunk]
+                for writer in writers:
+                    writer.write(chunk[writer.name])
+                rows += len(chunk)
+                if progress is not None:
+                    progress(f.tell(), total)
+        except _DatesNotParsed:
+            dates_failed = True
+        finally:
+            reader.close()
+            for writer in writers or ():
+                writer.file.close()
+    if dates_failed:
+        return build_cache(path, cache_dir, progress, cancelled, chunk_rows, text_dates=True)
+
+    columns = []
+    for writer in writers or ():
+        column = {"name": writer.name, "kind": writer.kind, "file": writer.name + ".bin",
+                  "dtype": str(writer.dtype)}
+        column.update(writer.finish(rows))
+        columns.append(column)
+    meta = {"version": CACHE_VERSION, "source": _source_stamp(path), "rows": rows, "columns": columns}
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+# Загрузка CSV для анализа: из свежего кэша рядом с файлом, иначе кэш строится
+# заново. Если рядом с CSV писать нельзя, кэш строится во временном каталоге
+# (temp_cache_dir_for) и при следующей загрузке берётся оттуда.
+def load_csv(path, progress=None, cancelled=None, chunk_rows=CHUNK_ROWS):
+    for cache_dir in (cache_dir_for(path), temp_cache_dir_for(path)):
+        if _cache_is_fresh(path, cache_dir):
+            return open_cache(cache_dir)
+    cache_dir = cache_dir_for(path)
+    try:
+        build_cache(path, cache_dir, progress, cancelled, chunk_rows)
+    except OSError:
+        cache_dir = temp_cache_dir_for(path)
+        build_cache(path, cache_dir, progress, cancelled, chunk_rows)
+    return open_cache(cache_dir)
+
+
+# Оценка числа различных значений (HyperLogLog): 2**precision однобайтовых
+# регистров, каждый хранит наибольшую длину серии нулей в 64-битных хэшах своей
+# доли значений. Погрешность около 1.04 / sqrt(2**precision), то есть ~0.8% при
+# precision=14 (16 КБ), при любом числе значений; добавление значения - O(1).
+class DistinctSketch:
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, values):
+        if not len(values):
+            return
+        hashes = pd.util.hash_array(np.asarray(values))
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        rest = hashes << np.uint64(self.precision)
+        # Номер старшего единичного бита через показатель степени float; для rest == 0 - предел
+        rank = np.minimum(65 - np.frexp(rest.astype(np.float64))[1], 65 - self.precision)
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def estimate(self):
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # Мало значений: точнее подсчёт пустых регистров
+        return int(round(estimate))
+
+
+# Равномерная выборка фиксированного размера (reservoir sampling, алгоритм R) для
+# оценки квантилей: значение номер t попадает в выборку с вероятностью size / t и
+# вытесняет случайный элемент. Пока значений не больше size, квантили точные;
+# дальше ошибка квартилей - порядка 0.2% размаха при size=65536 (512 КБ).
+class QuantileSketch:
+    def __init__(self, size=65536, seed=0):
+        self.size = size
+        self.sample = np.empty(size)
+        self.filled = 0
+        self.seen = 0
+        self.random = np.random.default_rng(seed)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        free = min(self.size - self.filled, len(values))
+        self.sample[self.filled:self.filled + free] = values[:free]
+        self.filled += free
+        self.seen += free
+        rest = values[free:]
+        if len(rest):
+            # Для значения номер t - случайная позиция из [0, t); позиции внутри выборки
+            # заменяются. При повторах должно победить более позднее значение, как при
+            # поочерёдном добавлении; присваивание по индексу с повторами этого не
+            # гарантирует, поэтому для каждой позиции берётся её последнее вхождение
+            slots = self.random.integers(0, self.seen + 1 + np.arange(len(rest)))
+            taken = np.flatnonzero(slots < self.size)[::-1]
+            slots, first = np.unique(slots[taken], return_index=True)
+            self.sample[slots] = rest[taken[first]]
+            self.seen += len(rest)
+
+    @property
+    def exact(self):
+        return self.seen <= self.size
+
+    def quantiles(self, q):
+        if not self.filled:
+            return None
+        return np.quantile(self.sample[:self.filled], q)
+
+
+# Столбец ColumnStore: данные в буфере NumPy с запасом ёмкости; для категорий -
+# коды int32 и словарь категорий, пополняемый новыми значениями
+class _StoreColumn:
+    def __init__(self, kind, values, categories=None):
+        self.kind = kind
+        self.values = values
+        self.owned = False  # values - собственный буфер с запасом, а не данные загрузки
+        self.categories = [] if categories is None else list(categories)
+        self.codes = {value: code for code, value in enumerate(self.categories)}
+        self._index = None if categories is None else pd.Index(categories)
+
+    @classmethod
+    def for_series(cls, series):
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            return cls("category", series.cat.codes.to_numpy(), dtype.categories)
+        if pd.api.types.is_datetime64_dtype(dtype):
+            return cls("datetime", series.to_numpy(dtype="datetime64[ns]"))
+        return cls("float", series.to_numpy(dtype=np.float32, na_value=np.nan))
+
+    # Пустой столбец по первым добавляемым значениям: числа, даты (если все
+    # разбираются) или категории строк - как при построении кэша
+    @classmethod
+    def for_values(cls, values):
+        values = pd.Series(values)
+        if pd.api.types.is_numeric_dtype(values.dtype):
+            return cls("float", np.empty(0, np.float32))
+        if pd.to_datetime(values, errors="coerce", format="mixed").isna().sum() == values.isna().sum():
+            return cls("datetime", np.empty(0, "datetime64[ns]"))
+        return cls("category", np.empty(0, np.int32))
+
+    def missing(self):
+        return {"float": np.nan, "datetime": np.datetime64("NaT"), "category": -1}[self.kind]
+
+    # Добавляемые значения в типе буфера; ValueError, если они не разбираются
+    def convert(self, values):
+        if self.kind == "float":
+            return np.asarray(values, dtype=np.float32)
+        if self.kind == "datetime":
+            return pd.to_datetime(pd.Series(values, dtype=object)).to_numpy(dtype="datetime64[ns]")
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            if pd.isna(value):
+                codes[i] = -1
+                continue
+            value = str(value)
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.categories)
+                self.categories.append(value)
+                self._index = None
+            codes[i] = code
+        return codes
+
+    def series(self, name, length):
+        values = self.values[:length]
+        if self.kind == "category":
+            if self._index is None:
+                self._index = pd.Index(self.categories, dtype=object)
+            return pd.Series(pd.Categorical.from_codes(values, categories=self._index, ordered=True,
+                                                       validate=False), name=name, copy=False)
+        return pd.Series(values, name=name, copy=False)
+
+
+# Колоночное хранилище с дозаписью строк для 6Lab. Столбцы - буферы NumPy с
+# запасом: при нехватке места ёмкость растёт в GROWTH раз, так что добавление
+# строки в среднем стоит O(1) независимо от размера таблицы. Загруженные данные
+# (memmap кэша) копируются в буферы только при первом добавлении. frame() отдаёт
+# DataFrame из срезов буферов без копирования; дописанные позже строки в уже
+# выданные таблицы не попадают.
+class ColumnStore:
+    GROWTH = 1.5
+    MIN_CAPACITY = 1024
+
+    def __init__(self):
+        self.columns = {}
+        self.length = 0
+        self._frame = None
+
+    @classmethod
+    def from_frame(cls, data):
+        store = cls()
+        store.columns = {name: _StoreColumn.for_series(data[name]) for name in data.columns}
+        store.length = len(data)
+        return store
+
+    def __len__(self):
+        return self.length
+
+    def capacity(self):
+        return min((len(column.values) for column in self.columns.values()), default=0)
+
+    def _reserve(self, length):
+        for column in self.columns.values():
+            values = column.values
+            if column.owned and len(values) >= length:
+                continue
+            capacity = max(length, int(len(values) * self.GROWTH), self.MIN_CAPACITY)
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self.length] = values[:self.length]
+            column.values = grown
+            column.owned = True
+
+    # Добавляет пачку строк: rows - словарь столбец -> список значений одной длины.
+    # Столбцы, которых нет в пачке, получают пропуски; новые столбцы заводятся с
+    # пропусками в прежних строках. Все значения разбираются до записи, поэтому при
+    # ValueError хранилище не меняется. Возвращает DataFrame добавленных строк.
+    def append(self, rows):
+        count = len(next(iter(rows.values()), ()))
+        if any(len(values) != count for values in rows.values()):
+            raise ValueError("столбцы пачки разной длины")
+        if not count:
+            return self.frame().iloc[:0]
+
+        columns = dict(self.columns)
+        for name, values in rows.items():
+            if name not in columns:
+                column = columns[name] = _StoreColumn.for_values(values)
+                column.values = np.full(self.length, column.missing(), dtype=column.values.dtype)
+        converted = {name: columns[name].convert(values) for name, values in rows.items()}
+
+        self.columns = columns
+        start = self.length
+        self._reserve(start + count)
+        for name, column in self.columns.items():
+            values = converted.get(name)
+            column.values[start:start + count] = column.missing() if values is None else values
+        self.length += count
+        self._frame = None
+        return self.frame().iloc[start:]
+
+    def frame(self):
+        if self._frame is None:
+            self._frame = pd.DataFrame({name: column.series(name, self.length)
+                                        for name, column in self.columns.items()}, copy=False)
+        return self._frame
+
+    def column(self, name):
+        return self.columns[name].values[:self.length]
+
+
+# Статистика одного столбца. Числа: количество, min/max, среднее и сумма квадратов
+# отклонений (M2) для дисперсии, выборка для квантилей и HyperLogLog. Даты: количество,
+# min/max и HyperLogLog (по int64 наносекундам). Категории: количество, min/max по
+# упорядоченным категориям и точное число различных по флагам встреченных категорий.
+class ColumnStats:
+    def __init__(self, kind, dtype=None, categories=None):
+        self.kind = kind
+        self.dtype = np.dtype(dtype) if dtype is not None else None
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.quantile_sketch = QuantileSketch() if kind == "number" else None
+        self.distinct_sketch = DistinctSketch() if kind != "category" else None
+        if kind == "category":
+            self.categories = pd.Index(categories)
+            self.seen_categories = np.zeros(len(self.categories), dtype=bool)
+            self.new_categories = set()  # Добавленные значения, которых нет среди категорий
+
+    @classmethod
+    def for_series(cls, series):
+        dtype = series.dtype
+        if isinstance(dtype, pd.CategoricalDtype):
+            return cls("category", categories=dtype.categories)
+        if pd.api.types.is_datetime64_dtype(dtype):
+            return cls("datetime", "datetime64[ns]")
+        if pd.api.types.is_numeric_dtype(dtype):
+            return cls("number", dtype)
+        return cls("text")
+
+    # Пачка значений: все показатели - векторными проходами, среднее и M2 сливаются
+    # с накопленными по формуле Чана для объединения выборок
+    def update(self, series):
+        if self.kind == "category":
+            codes = series.cat.codes.to_numpy()
+            codes = codes[codes >= 0]
+            categories = series.cat.categories
+            if not len(codes):
+                pass
+            elif categories.equals(self.categories):
+                self.seen_categories |= np.bincount(codes, minlength=len(categories)).astype(bool)
+                self._extend(categories[codes.min()], categories[codes.max()])
+            else:
+                # Категории пачки другие (дополнены ColumnStore) - сверка по значениям
+                for value in categories[np.flatnonzero(np.bincount(codes))]:
+                    self._see_category(value)
+            self.count += len(codes)
+            return
+
+        if self.kind == "number":
+            values = series.to_numpy()
+            if values.dtype.kind == "f":
+                values = values[~np.isnan(values)]
+        elif self.kind == "datetime":
+            values = series.to_numpy(dtype="datetime64[ns]")
+            values = values[~np.isnat(values)].view(np.int64)
+        else:
+            values = series.dropna().to_numpy(dtype=object)
+        if not len(values):
+            return
+
+        self.distinct_sketch.add(values)
+        if self.kind == "text":
+            self._extend(min(values, key=str), max(values, key=str))
+        else:
+            self._extend(values.min(), values.max())
+        if self.kind == "number":
+            self.quantile_sketch.add(values)
+            count = len(values)
+            mean = values.mean(dtype=np.float64)
+            m2 = np.square(values - mean, dtype=np.float64).sum()
+            total = self.count + count
+            delta = mean - self.mean
+            self.m2 += m2 + delta * delta * self.count * count / total
+            self.mean += delta * count / total
+        self.count += len(values)
+
+    # Одно добавленное значение - O(1): среднее и M2 по Уэлфорду
+    def append(self, value):
+        if pd.isna(value):
+            return
+        if self.kind == "category":
+            self._see_category(value)
+            self.count += 1
+            return
+
+        if self.kind == "number":
+            value = self.dtype.type(value)  # То же округление, что у значений столбца (float32)
+        elif self.kind == "datetime":
+            value = np.int64(pd.Timestamp(value).value)
+        self.distinct_sketch.add(np.array([value], dtype=object if self.kind == "text" else None))
+        self._extend(value, value)
+        self.count += 1
+        if self.kind == "number":
+            self.quantile_sketch.add([value])
+            delta = float(value) - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (float(value) - self.mean)
+
+    def _see_category(self, value):
+        if value in self.categories:
+            self.seen_categories[self.categories.get_loc(value)] = True
+        else:
+            self.new_categories.add(value)
+        self._extend(value, value)
+
+    def _extend(self, low, high):
+        if self.kind in ("category", "text"):
+            # Категории отсортированы по строкам (data_engine пишет их так же)
+            low_key, high_key = str, str
+        else:
+            low_key = high_key = lambda value: value
+        if self.min is None or low_key(low) < low_key(self.min):
+            self.min = low
+        if self.max is None or high_key(high) > high_key(self.max):
+            self.max = high
+
+    def _value(self, value):
+        if value is None:
+            return None
+        if self.kind == "datetime":
+            return pd.Timestamp(int(value))
+        if self.kind == "number":
+            return float(value)
+        return value
+
+    @property
+    def minimum(self):
+        return self._value(self.min)
+
+    @property
+    def maximum(self):
+        return self._value(self.max)
+
+    @property
+    def variance(self):
+        if self.kind != "number" or self.count < 2:
+            return None
+        return self.m2 / (self.count - 1)
+
+    def quantiles(self, q=(0.25, 0.5, 0.75)):
+        if self.quantile_sketch is None:
+            return None
+        return self.quantile_sketch.quantiles(q)
+
+    @property
+    def distinct(self):
+        if self.kind == "category":
+            return int(self.seen_categories.sum()) + len(self.new_categories)
+        return self.distinct_sketch.estimate() if self.count else 0
+
+
+# Статистика таблицы: считается один раз по загруженным данным пачками по chunk_rows
+# строк, дальше поддерживается добавлением строк за O(1) без обращения к таблице
+class DataStats:
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    @classmethod
+    def from_frame(cls, data, chunk_rows=CHUNK_ROWS):
+        stats = cls()
+        stats.columns = {name: ColumnStats.for_series(data[name]) for name in data.columns}
+        for start in range(0, len(data), chunk_rows):
+            chunk = data.iloc[start:start + chunk_rows]
+            for name, column in stats.columns.items():
+                column.update(chunk[name])
+        stats.rows = len(data)
+        return stats
+
+    # Пачка добавленных строк (DataFrame) - векторно, как при первом подсчёте
+    def extend(self, rows):
+        for name in rows.columns:
+            if name not in self.columns:
+                self.columns[name] = ColumnStats.for_series(rows[name])
+            self.columns[name].update(rows[name])
+        self.rows += len(rows)
+
+    # row - словарь столбец -> значение; столбцы, которых ещё не было, заводятся
+    # по типу значения (в прежних строках они считаются пропусками)
+    def append(self, row):
+        for name, value in row.items():
+            if name not in self.columns:
+                if isinstance(value, (int, float, np.number)):
+                    self.columns[name] = ColumnStats("number", np.float64)
+                else:
+                    self.columns[name] = ColumnStats("text")
+            self.columns[name].append(value)
+        self.rows += 1
+
+
+# Подпись точки оси X: дата без времени, если оно нулевое, иначе исходная строка
+def date_label(dates, row):
+    row = int(round(row))
+    if not 0 <= row < len(dates):
+        return ""
+    value = dates.iloc[row]
+    if isinstance(value, pd.Timestamp):
+        return np.datetime_as_string(value.to_datetime64(), unit="auto")
+    return "" if pd.isna(value) else str(value)
+
+
+# Пирамида min/max для прореживания линейного графика. Уровень k хранит для блоков
+# по factor**k строк минимум, максимум и номера строк, где они достигаются. Запрос
+# диапазона строк на width пикселей берёт самый грубый уровень, у которого в один
+# пиксель попадает хотя бы один блок, и сводит блоки в width корзин: от каждой
+# корзины остаются две точки (минимум и максимум), так что пики не теряются, а
+# число точек и работа не зависят от числа строк. Пропуски (NaN) дают разрыв линии.
+# Уровни лежат в буферах с запасом, как столбцы ColumnStore: дописанные строки
+# пересчитывают на каждом уровне только последние блоки.
+class LinePyramid:
+    GROWTH = 1.5
+
+    def __init__(self, values, factor=4, smallest=256):
+        self.factor = factor
+        self.smallest = smallest
+        self.values = np.empty(0)
+        self.levels = []  # (размер блока, минимумы, номера минимумов, максимумы, номера максимумов)
+        self._buffers = []  # [размер блока, число блоков, минимумы, номера, максимумы, номера] с запасом
+        self.update(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    # values - прежние значения с дописанными в конец строками (например, столбец
+    # ColumnStore.frame() после добавления); пересчитываются блоки начиная с
+    # последнего неполного, новые уровни добавляются по мере роста
+    def update(self, values):
+        old = len(self.values)
+        self.values = values = np.asarray(values)
+        below_count = len(values)
+        level = 0
+        while level < len(self._buffers) or below_count > self.smallest:
+            block = self.factor ** (level + 1)
+            if level == len(self._buffers):
+                self._buffers.append([block, 0] + [np.empty(0)] * 4)
+                first = 0
+            else:
+                first = min(old // block, self._buffers[level][1])
+
+            start = first * self.factor
+            if level == 0:
+                part = values[start:]
+                mins = np.where(np.isnan(part), np.inf, part)
+                maxs = np.where(np.isnan(part), -np.inf, part)
+                min_rows = max_rows = np.arange(start, len(values))
+            else:
+                _, count, mins, min_rows, maxs, max_rows = self._buffers[level - 1]
+                mins, min_rows = mins[start:count], min_rows[start:count]
+                maxs, max_rows = maxs[start:count], max_rows[start:count]
+            reduced = (self._reduce(mins, min_rows, np.argmin, np.inf)
+                       + self._reduce(maxs, max_rows, np.argmax, -np.inf))
+            below_count = self._store(level, first, reduced)
+            level += 1
+
+        self.levels = [(block, mins[:count], min_rows[:count], maxs[:count], max_rows[:count])
+                       for block, count, mins, min_rows, maxs, max_rows in self._buffers]
+
+    def _store(self, level, first, reduced):
+        buffers = self._buffers[level]
+        count = first + len(reduced[0])
+        for i, part in enumerate(reduced, start=2):
+            buffer = buffers[i]
+            if len(buffer) < count or buffer.dtype != part.dtype:
+                grown = np.empty(max(count, int(len(buffer) * self.GROWTH)), dtype=part.dtype)
+                grown[:first] = buffer[:first]
+                buffers[i] = buffer = grown
+            buffer[first:count] = part
+        buffers[1] = count
+        return count
+
+    def _reduce(self, values, rows, pick, fill, group=None):
+        group = group or self.factor
+        count = -(-len(values) // group)
+        padded = np.full(count * group, fill, dtype=values.dtype)
+        padded[:len(values)] = values
+        padded_rows = np.zeros(count * group, dtype=rows.dtype)
+        padded_rows[:len(rows)] = rows
+        padded = padded.reshape(count, group)
+        chosen = pick(padded, axis=1)
+        picked = np.arange(count) * group + chosen
+        return padded.reshape(-1)[picked], padded_rows[picked]
+
+    def query(self, start, stop, width):
+        start = max(0, start)
+        stop = min(len(self.values), stop)
+        width = max(1, width)
+        if stop - start <= 2 * width:
+            x = np.arange(start, stop)
+            return x, self.values[start:stop]
+
+        per_bucket = (stop - start) / width
+        chosen = None
+        for level in self.levels:
+            if level[0] > per_bucket:
+                break
+            chosen = level
+        if chosen is None:
+            values = self.values[start:stop]
+            mins = np.where(np.isnan(values), np.inf, values)
+            maxs = np.where(np.isnan(values), -np.inf, values)
+            min_rows = max_rows = np.arange(start, stop)
+        else:
+            block, mins, min_rows, maxs, max_rows = chosen
+            first = start // block
+            last = -(-stop // block)
+            mins, min_rows = mins[first:last], min_rows[first:last]
+            maxs, max_rows = maxs[first:last], max_rows[first:last]
+        group = max(1, -(-len(mins) // width))
+        low, low_rows = self._reduce(mins, min_rows, np.argmin, np.inf, group)
+        high, high_rows = self._reduce(maxs, max_rows, np.argmax, -np.inf, group)
+
+        # Две точки на корзину в порядке строк
+        x = np.empty(2 * len(low))
+        y = np.empty(2 * len(low))
+        low_first = low_rows <= high_rows
+        x[0::2] = np.where(low_first, low_rows, high_rows)
+        x[1::2] = np.where(low_first, high_rows, low_rows)
+        y[0::2] = np.where(low_first, low, high)
+        y[1::2] = np.where(low_first, high, low)
+        y[np.isinf(y)] = np.nan
+        return x, y
+
+    # Диапазон значений по верхнему уровню (не больше smallest блоков)
+    def value_range(self):
+        if self.levels:
+            _, mins, _, maxs, _ = self.levels[-1]
+            low, high = mins.min(), maxs.max()
+        elif len(self.values) and not np.isnan(self.values).all():
+            low, high = np.nanmin(self.values), np.nanmax(self.values)
+        else:
+            return None
+        if np.isinf(low):
+            return None
+        return float(low), float(high)
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = ".http_cache"
+
+
+# Ответ из кэша с тем же интерфейсом, что используют лабораторные: status_code и json().
+# Разобранные данные общие для всех читателей, изменять их нельзя.
+class CachedResponse:
+    def __init__(self, status_code, data=None, from_cache=False):
+        self.status_code = status_code
+        self._data = data
+        self.from_cache = from_cache
+
+    def json(self):
+        return self._data
+
+
+class _Entry:
+    __slots__ = ("url", "data", "size", "etag", "last_modified", "stored_at")
+
+    def __init__(self, url, data, size, etag, last_modified, stored_at):
+        self.url = url
+        self.data = data
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+
+# Кэш GET-ответов по URL: в памяти (разобранный JSON) и на диске (тело + заголовки).
+# Свежие записи (младше ttl) отдаются без сети, устаревшие перепроверяются
+# условным запросом (If-None-Match / If-Modified-Since): на 304 возвращаются уже
+# разобранные данные. Оба уровня вытесняются по LRU при превышении лимита в байтах.
+class ResponseCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, ttl=60, max_memory_bytes=64 * 1024 * 1024,
+                 max_disk_bytes=256 * 1024 * 1024, session=None, timeout=30):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._session = session
+        self.timeout = timeout
+        self.stats = {"hits": 0, "misses": 0, "revalidations": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    # requests импортируется при первом запросе, а не при запуске программы
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def hit_rate(self):
+        served = self.stats["hits"] + self.stats["revalidations"]
+        total = served + self.stats["misses"]
+        return served / total if total else 0.0
+
+    # progress(received, total) вызывается по мере чтения тела ответа (total - None,
+    # если сервер не прислал Content-Length); исключение из progress прерывает загрузку.
+    # max_age заменяет ttl для этого запроса (0 - всегда перепроверять у сервера)
+    def get(self, url, progress=None, max_age=None):
+        ttl = self.ttl if max_age is None else max_age
+        entry = self._lookup(url)
+        if entry is not None and time.time() - entry.stored_at < ttl:
+            self._count("hits")
+            return CachedResponse(200, entry.data, from_cache=True)
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            return self._handle_response(url, entry, response, progress)
+
+    def _handle_response(self, url, entry, response, progress):
+        if response.status_code == 304 and entry is not None:
+            self._count("revalidations")
+            entry.etag = response.headers.get("ETag", entry.etag)
+            entry.last_modified = response.headers.get("Last-Modified", entry.last_modified)
+            entry.stored_at = time.time()
+            self._write_meta(entry)
+            return CachedResponse(200, entry.data, from_cache=True)
+
+        self._count("misses")
+        if response.status_code != 200:
+            return CachedResponse(response.status_code)
+
+        body = self._read_body(response, progress)
+        entry = _Entry(url, json.loads(body), len(body), response.headers.get("ETag"),
+                       response.headers.get("Last-Modified"), time.time())
+        self._remember(entry)
+        self._write_disk(entry, body)
+        return CachedResponse(200, entry.data)
+
+    def _read_body(self, response, progress):
+        if progress is None:
+            return response.content
+        length = response.headers.get("Content-Length")
+        total = int(length) if length and length.isdigit() else None
+        body = bytearray()
+        progress(0, total)
+        for chunk in response.iter_content(64 * 1024):
+            body += chunk
+            progress(len(body), total)
+        return bytes(body)
+
+    def invalidate(self, url):
+        with self._lock:
+            entry = self._memory.pop(url, None)
+            if entry is not None:
+                self._memory_bytes -= entry.size
+        if self.cache_dir:
+            for path in self._paths(url):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self.cache_dir:
+            for name in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _lookup(self, url):
+        with self._lock:
+            entry = self._memory.get(url)
+            if entry is not None:
+                self._memory.move_to_end(url)
+                return entry
+        entry = self._read_disk(url)
+        if entry is not None:
+            self._remember(entry)
+        return entry
+
+    def _remember(self, entry):
+        with self._lock:
+            old = self._memory.pop(entry.url, None)
+            if old is not None:
+                self._memory_bytes -= old.size
+            if entry.size > self.max_memory_bytes:
+                return
+            self._memory[entry.url] = entry
+            self._memory_bytes += entry.size
+            while self._memory_bytes > self.max_memory_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.size
+                self.stats["evictions"] += 1
+
+    # На диске запись - это пара файлов: <sha1>.body (сырое тело) и <sha1>.meta (заголовки)
+    def _paths(self, url):
+        name = hashlib.sha1(url.encode()).hexdigest()
+        return (os.path.join(self.cache_dir, name + ".body"),
+                os.path.join(self.cache_dir, name + ".meta"))
+
+    def _read_disk(self, url):
+        if not self.cache_dir:
+            return None
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        # Обновляем время доступа для дискового LRU
+        os.utime(body_path)
+        return _Entry(url, json.loads(body), len(body), meta.get("etag"),
+                      meta.get("last_modified"), meta["stored_at"])
+
+    def _write_meta(self, entry):
+        if not self.cache_dir:
+            return
+        _, meta_path = self._paths(entry.url)
+        meta = {"url": entry.url, "etag": entry.etag,
+                "last_modified": entry.last_modified, "stored_at": entry.stored_at}
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _write_disk(self, entry, body):
+        if not self.cache_dir or len(body) > self.max_disk_bytes:
+            return
+        body_path, _ = self._paths(entry.url)
+        tmp_path = body_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, body_path)
+        self._write_meta(entry)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        bodies = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".body"):
+                path = os.path.join(self.cache_dir, name)
+                stat = os.stat(path)
+                bodies.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        bodies.sort()
+        for _, size, path in bodies:
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            meta_path = path[:-len(".body")] + ".meta"
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+            total -= size
+            self._count("evictions")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+# Общий для всех лабораторных экземпляр кэша
+def get_default_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
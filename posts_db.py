@@ -0,0 +1,499 @@
+import io
+import os
+import re
+import sys
+import csv
+import json
+import sqlite3
+import time
+import hashlib
+import itertools
+import threading
+from contextlib import contextmanager
+from collections import namedtuple
+
+SyncSummary = namedtuple('SyncSummary', ['inserted', 'updated', 'deleted', 'unchanged'])
+
+
+# Служебная таблица синхронизации: хэш содержимого каждого удалённого поста
+# и id строки в posts, в которую он записан. Создаётся один раз при открытии БД
+# (вместе с posts); транзакцией, как и во всех функциях записи ниже, управляет
+# вызывающий код (ConnectionManager.writer)
+def create_sync_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS posts_sync (
+            remote_id INTEGER PRIMARY KEY,
+            local_id INTEGER NOT NULL,
+            hash TEXT NOT NULL
+        )
+    ''')
+
+
+def post_hash(post):
+    content = json.dumps([post['userId'], post['title'], post['body']], ensure_ascii=False)
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+
+SyncPlan = namedtuple('SyncPlan', ['inserts', 'updates', 'deletes', 'unchanged'])
+
+
+# Инкрементальная синхронизация posts с удалённой лентой: по хэшам вычисляются
+# вставки, изменения и удаления (plan_sync), и в одной транзакции применяется только
+# эта разница (apply_sync). Разницу можно вычислить на соединении чтения, а блокировку
+# записи держать только на время apply_sync.
+# keep_remote_ids - записывать пост под его удалённым id (схема 3Lab), иначе id
+# выдаёт AUTOINCREMENT, а соответствие хранится в posts_sync (схема 5Lab).
+# full=False - лента содержит только часть постов, отсутствующие не удаляются.
+# В changed_ids (множество) добавляются id затронутых строк posts.
+def sync_posts(conn, posts, keep_remote_ids=False, full=True, changed_ids=None):
+    return apply_sync(conn, plan_sync(conn, posts, full), keep_remote_ids, changed_ids)
+
+
+# Разница между лентой и posts_sync: вставки и изменения - списки (пост, хэш),
+# удаления - удалённые id. Только чтение.
+def plan_sync(conn, posts, full=True):
+    if full:
+        rows = conn.execute('SELECT remote_id, local_id, hash FROM posts_sync')
+    else:
+        # Только состояние постов этой части: пачки не перечитывают posts_sync целиком
+        posts = list(posts)
+        rows = conn.execute(
+            'SELECT remote_id, local_id, hash FROM posts_sync WHERE remote_id IN (SELECT value FROM json_each(?))',
+            (json.dumps([post['id'] for post in posts]),))
+    known = {remote_id: hash_ for remote_id, _, hash_ in rows}
+
+    inserts = []
+    updates = []
+    seen = set()
+    unchanged = 0
+    for post in posts:
+        remote_id = post['id']
+        seen.add(remote_id)
+        hash_ = post_hash(post)
+        known_hash = known.get(remote_id)
+        if known_hash is None:
+            inserts.append((post, hash_))
+        elif known_hash != hash_:
+            updates.append((post, hash_))
+        else:
+            unchanged += 1
+    deletes = [remote_id for remote_id in known if remote_id not in seen] if full else []
+    return SyncPlan(inserts, updates, deletes, unchanged)
+
+
+# Применение разницы в транзакции вызывающего кода. Состояние затронутых постов
+# перечитывается: между plan_sync и apply_sync их мог записать другой писатель -
+# пост с тем же хэшем пропускается, вставка уже записанного становится изменением,
+# удаление уже удалённого не выполняется.
+def apply_sync(conn, plan, keep_remote_ids=False, changed_ids=None):
+    touched = [post['id'] for post, _ in plan.inserts + plan.updates] + plan.deletes
+    if not touched:
+        return SyncSummary(0, 0, 0, plan.unchanged)
+    current = {remote_id: (local_id, hash_) for remote_id, local_id, hash_ in conn.execute(
+        'SELECT remote_id, local_id, hash FROM posts_sync WHERE remote_id IN (SELECT value FROM json_each(?))',
+        (json.dumps(touched),))}
+
+    inserted = updated = 0
+    unchanged = plan.unchanged
+    cursor = conn.cursor()
+    for post, hash_ in plan.inserts + plan.updates:
+        state = current.get(post['id'])
+        if state is not None:
+            local_id, current_hash = state
+            if current_hash == hash_:
+                unchanged += 1
+                continue
+            cursor.execute('UPDATE posts SET user_id = ?, title = ?, body = ? WHERE id = ?',
+                           (post['userId'], post['title'], post['body'], local_id))
+            if cursor.rowcount:
+                updated += 1
+                if changed_ids is not None:
+                    changed_ids.add(local_id)
+                cursor.execute('UPDATE posts_sync SET hash = ? WHERE remote_id = ?', (hash_, post['id']))
+                continue
+            # Строку удалили локально - записываем пост заново
+
+        row = (post['userId'], post['title'], post['body'])
+        if keep_remote_ids:
+            cursor.execute('''
+                INSERT INTO posts (id, user_id, title, body) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    user_id = excluded.user_id, title = excluded.title, body = excluded.body
+            ''', (post['id'],) + row)
+            local_id = post['id']
+        else:
+            cursor.execute('INSERT INTO posts (user_id, title, body) VALUES (?, ?, ?)', row)
+            local_id = cursor.lastrowid
+        inserted += 1
+        if changed_ids is not None:
+            changed_ids.add(local_id)
+        cursor.execute('INSERT OR REPLACE INTO posts_sync (remote_id, local_id, hash) VALUES (?, ?, ?)',
+                       (post['id'], local_id, hash_))
+
+    deletes = [(remote_id, current[remote_id][0]) for remote_id in plan.deletes if remote_id in current]
+    _delete_synced(cursor, deletes, changed_ids)
+
+    return SyncSummary(inserted, updated, len(deletes), unchanged)
+
+
+def _delete_synced(cursor, deletes, changed_ids=None):
+    cursor.executemany('DELETE FROM posts WHERE id = ?', [(local_id,) for _, local_id in deletes])
+    cursor.executemany('DELETE FROM posts_sync WHERE remote_id = ?', [(remote_id,) for remote_id, _ in deletes])
+    if changed_ids is not None:
+        changed_ids.update(local_id for _, local_id in deletes)
+
+
+# Курсор для запроса только новых постов: наибольший удалённый id среди уже
+# синхронизированных (0, если их нет). Только чтение - подходит соединение reader(),
+# таблица posts_sync создаётся вместе со схемой
+def sync_watermark(conn):
+    return conn.execute('SELECT COALESCE(MAX(remote_id), 0) FROM posts_sync').fetchone()[0]
+
+
+# Завершение синхронизации, применённой частями через sync_posts(..., full=False):
+# удаляются посты, которых нет среди remote_ids. Возвращает число удалённых.
+def prune_posts(conn, remote_ids, changed_ids=None):
+    remote_ids = set(remote_ids)
+    deletes = [(remote_id, local_id) for remote_id, local_id
+               in conn.execute('SELECT remote_id, local_id FROM posts_sync') if remote_id not in remote_ids]
+    if deletes:
+        _delete_synced(conn.cursor(), deletes, changed_ids)
+    return len(deletes)
+
+
+_FTS_INSERT_TRIGGER = '''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+'''
+
+_FTS_SCHEMA = (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, body,
+        content = 'posts', content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, body ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO posts_fts (rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    ''',
+    _FTS_INSERT_TRIGGER,
+)
+
+
+# Полнотекстовый индекс FTS5 по title и body. Таблица внешнего содержимого:
+# тексты хранятся только в posts, а триггеры держат индекс в актуальном состоянии.
+# Для существующих файлов posts.db индекс строится при первом вызове (миграция).
+# Отдельные execute, а не executescript: тот фиксирует открытую транзакцию.
+def create_search_index(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'").fetchone()
+    for statement in _FTS_SCHEMA:
+        conn.execute(statement)
+    if not exists:
+        conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+
+
+# Строка поиска из поля ввода -> выражение FTS5: текст в кавычках ищется как фраза,
+# остальные слова - как префиксы; все части должны встретиться (AND)
+def build_match_query(text):
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"?|(\S+)', text):
+        if any(ch.isalnum() for ch in phrase):
+            terms.append('"' + phrase + '"')
+        elif any(ch.isalnum() for ch in word):
+            terms.append('"' + word.replace('"', '') + '"*')
+    return ' '.join(terms) or None
+
+
+# Поиск постов с ранжированием bm25 (совпадение в заголовке весит больше, чем в тексте);
+# limit=None - без ограничения числа результатов
+def search_posts(conn, text, limit=100):
+    query = build_match_query(text)
+    if query is None:
+        return []
+    return conn.execute('''
+        SELECT posts.id, posts.user_id, posts.title, posts.body
+        FROM posts_fts JOIN posts ON posts.id = posts_fts.rowid
+        WHERE posts_fts MATCH ?
+        ORDER BY bm25(posts_fts, 10.0, 1.0)
+        LIMIT ?
+    ''', (query, -1 if limit is None else limit)).fetchall()
+
+
+# id всех подходящих постов (для фильтрации уже загруженных строк таблицы);
+# None - строка поиска пустая, фильтр не нужен
+def search_post_ids(conn, text):
+    query = build_match_query(text)
+    if query is None:
+        return None
+    return {row[0] for row in conn.execute(
+        'SELECT rowid FROM posts_fts WHERE posts_fts MATCH ?', (query,))}
+
+
+# Массовое удаление одним запросом на пачку id (json_each вместо тысяч параметров);
+# транзакцией управляет вызывающий код
+def delete_posts(conn, record_ids, chunk_size=50000):
+    record_ids = [int(record_id) for record_id in record_ids]
+    deleted = 0
+    for start in range(0, len(record_ids), chunk_size):
+        cursor = conn.execute('DELETE FROM posts WHERE id IN (SELECT value FROM json_each(?))',
+                              (json.dumps(record_ids[start:start + chunk_size]),))
+        deleted += cursor.rowcount
+    return deleted
+
+
+# id из файла (например, выгруженного export_posts); пустое значение - новая строка
+def _import_id(value):
+    return None if value is None or value == '' else int(value)
+
+
+def _read_csv_posts(text):
+    for row in csv.DictReader(text):
+        yield _import_id(row.get('id')), row.get('user_id', row.get('userId')), row.get('title'), row.get('body')
+
+
+def _read_jsonl_posts(text):
+    for line in text:
+        if line.strip():
+            post = json.loads(line)
+            yield _import_id(post.get('id')), post.get('user_id', post.get('userId')), post.get('title'), post.get('body')
+
+
+_UPSERT_POST = '''
+    INSERT INTO posts (id, user_id, title, body) VALUES (?, ?, ?, ?)
+    ON CONFLICT(id) DO UPDATE SET
+        user_id = excluded.user_id, title = excluded.title, body = excluded.body
+'''
+
+
+def _write_rows(conn, keyed, plain):
+    conn.executemany(_UPSERT_POST, keyed)
+    conn.executemany('INSERT INTO posts (user_id, title, body) VALUES (?, ?, ?)', plain)
+
+
+# Вставка пачки строк. Строки с id заменяют существующие (повторный импорт выгрузки
+# не создаёт дубликатов), без id - добавляются. Если indexed_id не None, триггер
+# posts_fts_insert снят на время импорта и полнотекстовый индекс пополняется одним
+# INSERT ... SELECT (в разы быстрее построчного триггера): строками с id > indexed_id
+# и новыми id из файла ниже этой границы; изменённые строки обновляет триггер
+# posts_fts_update. Возвращает новую границу проиндексированных id.
+def _insert_batch(conn, batch, indexed_id=None):
+    keyed = {}
+    plain = []
+    for post_id, user_id, title, body in batch:
+        if post_id is None:
+            plain.append((user_id, title, body))
+        else:
+            keyed[post_id] = (post_id, user_id, title, body)  # Повтор id в файле: последняя версия
+    keyed = list(keyed.values())
+
+    if indexed_id is None:
+        _write_rows(conn, keyed, plain)
+        return None
+    new_ids = [row[0] for row in conn.execute(
+        'SELECT value FROM json_each(?) EXCEPT SELECT id FROM posts',
+        (json.dumps([row[0] for row in keyed if row[0] <= indexed_id]),))]
+    _write_rows(conn, keyed, plain)
+    conn.execute('''
+        INSERT INTO posts_fts (rowid, title, body) SELECT id, title, body FROM posts
+        WHERE id > ? OR id IN (SELECT value FROM json_each(?))
+    ''', (indexed_id, json.dumps(new_ids)))
+    return conn.execute('SELECT coalesce(max(id), 0) FROM posts').fetchone()[0]
+
+
+# Потоковый импорт CSV или JSONL (по расширению): файл читается построчно, строки
+# пишутся пачками по batch_size, каждая пачка - своя транзакция. progress(done, total)
+# получает число прочитанных и общее число байт файла. Триггер posts_fts_insert
+# снимается один раз на весь импорт, а не на каждую пачку, и восстанавливается в
+# finally - в том числе после ошибки в файле. Строки, вставленные другими
+# соединениями между пачками, индексируются по границе id следующей пачкой или в finally.
+def import_posts(manager, path, progress=None, batch_size=50000):
+    total = os.path.getsize(path)
+    imported = 0
+    indexed_id = None
+    with manager.writer() as conn:
+        if conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'posts_fts_insert'").fetchone():
+            conn.execute('DROP TRIGGER posts_fts_insert')
+            indexed_id = conn.execute('SELECT coalesce(max(id), 0) FROM posts').fetchone()[0]
+    try:
+        with open(path, 'rb') as raw:
+            text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            rows = _read_jsonl_posts(text) if path.lower().endswith('.jsonl') else _read_csv_posts(text)
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                with manager.writer() as conn:
+                    indexed_id = _insert_batch(conn, batch, indexed_id)
+                imported += len(batch)
+                if progress is not None:
+                    progress(raw.tell(), total)
+    finally:
+        if indexed_id is not None:
+            with manager.writer() as conn:
+                conn.execute('''
+                    INSERT INTO posts_fts (rowid, title, body) SELECT id, title, body FROM posts
+                    WHERE id > ?
+                ''', (indexed_id,))
+                conn.execute(_FTS_INSERT_TRIGGER)
+    return imported
+
+
+# Потоковый экспорт в CSV или JSONL страницами по batch_size (keyset по id);
+# progress(done, total) получает число выгруженных строк и их общее число
+def export_posts(manager, path, progress=None, batch_size=50000):
+    conn = manager.reader()
+    total = conn.execute('SELECT count(*) FROM posts').fetchone()[0]
+    jsonl = path.lower().endswith('.jsonl')
+    exported = 0
+    last_id = None
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = None if jsonl else csv.writer(f)
+        if writer is not None:
+            writer.writerow(['id', 'user_id', 'title', 'body'])
+        while True:
+            rows = conn.execute(
+                'SELECT id, user_id, title, body FROM posts WHERE id > ? ORDER BY id LIMIT ?',
+                (-1 if last_id is None else last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            if jsonl:
+                f.writelines(json.dumps({'id': row[0], 'user_id': row[1], 'title': row[2], 'body': row[3]},
+                                        ensure_ascii=False) + '\n' for row in rows)
+            else:
+                writer.writerows(rows)
+            exported += len(rows)
+            last_id = rows[-1][0]
+            if progress is not None:
+                progress(exported, total)
+    return exported
+
+
+# Общий менеджер соединений с файлом БД для всех лабораторных.
+# Читатели: по одному постоянному соединению на поток. Писатель: одно соединение
+# на процесс, доступ к нему сериализуется блокировкой (в WAL читатели ему не мешают).
+# PRAGMA применяются один раз при открытии соединения, скомпилированные запросы
+# кэшируются самим sqlite3 (cached_statements) и живут вместе с соединением.
+# Счётчики: число открытых соединений, ожидание блокировки записи и ошибки
+# "database is locked".
+class ConnectionManager:
+    PRAGMAS = (
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        'PRAGMA cache_size=-65536',
+        'PRAGMA temp_store=MEMORY',
+    )
+
+    def __init__(self, db_name='posts.db', busy_timeout=5.0, cached_statements=256):
+        self.db_name = db_name
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self.connections_opened = 0
+        self.write_transactions = 0
+        self.write_wait_total = 0.0
+        self.write_wait_max = 0.0
+        self.busy_errors = 0
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writer = None
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.busy_timeout,
+                               cached_statements=self.cached_statements, check_same_thread=False)
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        with self._connections_lock:
+            self.connections_opened += 1
+            self._connections.append(conn)
+        return conn
+
+    # Соединение для чтения, закреплённое за текущим потоком
+    def reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._open()
+        return conn
+
+    # Транзакция записи: with manager.writer() as conn: ...
+    # Открывается явно (BEGIN IMMEDIATE - блокировка записи берётся сразу, и DDL
+    # тоже входит в транзакцию), фиксируется при выходе, откатывается при исключении.
+    # Функции, вызываемые внутри, сами не фиксируют и не откатывают.
+    @contextmanager
+    def writer(self):
+        started = time.perf_counter()
+        with self._write_lock:
+            waited = time.perf_counter() - started
+            self.write_transactions += 1
+            self.write_wait_total += waited
+            self.write_wait_max = max(self.write_wait_max, waited)
+            if self._writer is None:
+                self._writer = self._open()
+            try:
+                self._writer.execute('BEGIN IMMEDIATE')
+                yield self._writer
+                self._writer.commit()
+            except sqlite3.OperationalError as error:
+                if 'locked' in str(error) or 'busy' in str(error):
+                    self.busy_errors += 1
+                self._writer.rollback()
+                raise
+            except BaseException:
+                self._writer.rollback()
+                raise
+
+    def stats(self):
+        return {
+            'connections_opened': self.connections_opened,
+            'write_transactions': self.write_transactions,
+            'write_wait_total': self.write_wait_total,
+            'write_wait_max': self.write_wait_max,
+            'busy_errors': self.busy_errors,
+        }
+
+    def close(self):
+        with self._write_lock, self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+            self._writer = None
+            self._local = threading.local()
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+# Один менеджер на файл БД на весь процесс
+def get_manager(db_name='posts.db'):
+    with _managers_lock:
+        manager = _managers.get(db_name)
+        if manager is None:
+            manager = _managers[db_name] = ConnectionManager(db_name)
+        return manager
+
+
+# Миграция существующего файла: python posts_db.py [путь к posts.db]
+if __name__ == '__main__':
+    db_name = sys.argv[1] if len(sys.argv) > 1 else 'posts.db'
+    conn = sqlite3.connect(db_name)
+    with conn:
+        create_search_index(conn)
+    count = conn.execute('SELECT count(*) FROM posts_fts').fetchone()[0]
+    conn.close()
+    print(f"Полнотекстовый индекс готов: {db_name}, записей: {count}")
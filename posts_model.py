@@ -0,0 +1,288 @@
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+POST_COLUMNS = ("id", "user_id", "title", "body")
+
+
+# Ленивая модель таблицы posts для QTableView. Строки читаются страницами по
+# page_size с keyset-пагинацией (WHERE id > последний id ORDER BY id), поэтому
+# ни общее число строк, ни OFFSET не нужны. Qt догружает страницы через
+# canFetchMore/fetchMore при прокрутке вниз; в памяти держится не больше max_pages
+# страниц (LRU), вытесненная страница перечитывается по диапазону своих id.
+# Изменения отдельных строк (apply_changes) перечитывают только затронутые страницы,
+# поэтому страницы бывают разной длины: начало каждой хранится в _page_offsets.
+# Фильтр по списку id (set_ids) хранится в модели отсортированным массивом: страница
+# берёт из него свои id бинарным поиском и запрашивает только их.
+class PagedPostsModel(QAbstractTableModel):
+    def __init__(self, manager, headers=POST_COLUMNS, page_size=500, max_pages=32,
+                 editable=False, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.headers = list(headers)
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.editable = editable
+        self.pages_loaded = 0
+        self._where = ""
+        self._params = ()
+        self._ids = None
+        self._reset_state()
+        self._fetch_next_page()
+
+    def _reset_state(self):
+        self._pages = OrderedDict()
+        self._page_starts = []  # id первой строки каждой известной страницы
+        self._page_offsets = []  # номер первой строки страницы в модели
+        self._page_sizes = []
+        self._last_id = None
+        self._row_count = 0
+        self._exhausted = False
+
+    # Только строки с этими id (результат поиска по внешнему индексу); None снимает фильтр
+    def set_ids(self, ids):
+        self._ids = None if ids is None else array('q', sorted(ids))
+        self.refresh()
+
+    def set_filter(self, where, params=()):
+        self._where = where
+        self._params = tuple(params)
+        self.refresh()
+
+    # Перечитать таблицу: сбрасываются только загруженные страницы, так что время
+    # не зависит от размера таблицы
+    def refresh(self):
+        self.beginResetModel()
+        self._reset_state()
+        self._fetch_next_page(notify=False)
+        self.endResetModel()
+
+    def _select(self, conditions, params, limit=None):
+        conditions = list(conditions)
+        if self._where:
+            conditions.append(f"({self._where})")
+        sql = f"SELECT {', '.join(POST_COLUMNS)} FROM posts"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY id"
+        params = tuple(params) + self._params
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        self.pages_loaded += 1
+        return self.manager.reader().execute(sql, params).fetchall()
+
+    # Строки из отфильтрованного списка id с позиций start:stop (не больше страницы)
+    def _select_ids(self, start, stop):
+        ids = self._ids[start:stop]
+        if not ids:
+            return []
+        return self._select(("id IN (SELECT value FROM json_each(?))",), (json.dumps(ids.tolist()),))
+
+    def _query_page(self, after_id):
+        if self._ids is not None:
+            start = 0 if after_id is None else bisect_right(self._ids, after_id)
+            return self._select_ids(start, start + self.page_size)
+        if after_id is None:
+            return self._select((), (), self.page_size)
+        return self._select(("id > ?",), (after_id,), self.page_size)
+
+    # Страница занимает id от своей первой строки до первой строки следующей
+    # (у первой страницы нет нижней границы, последняя заканчивается на _last_id)
+    def _query_range(self, page_number):
+        if self._ids is not None:
+            start = 0 if page_number == 0 else bisect_left(self._ids, self._page_starts[page_number])
+            if page_number + 1 < len(self._page_starts):
+                stop = bisect_left(self._ids, self._page_starts[page_number + 1])
+            else:
+                stop = bisect_right(self._ids, self._last_id)
+            return self._select_ids(start, stop)
+        conditions, params = [], []
+        if page_number > 0:
+            conditions.append("id >= ?")
+            params.append(self._page_starts[page_number])
+        if page_number + 1 < len(self._page_starts):
+            conditions.append("id < ?")
+            params.append(self._page_starts[page_number + 1])
+        else:
+            conditions.append("id <= ?")
+            params.append(self._last_id)
+        return self._select(conditions, params)
+
+    def _store_page(self, page_number, rows):
+        self._pages[page_number] = rows
+        self._pages.move_to_end(page_number)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def _fetch_next_page(self, notify=True):
+        rows = self._query_page(self._last_id)
+        if len(rows) < self.page_size:
+            self._exhausted = True
+        if not rows:
+            return
+        page_number = len(self._page_starts)
+        self._page_starts.append(rows[0][0])
+        self._page_offsets.append(self._row_count)
+        self._page_sizes.append(len(rows))
+        self._last_id = rows[-1][0]
+        if notify:
+            self.beginInsertRows(QModelIndex(), self._row_count, self._row_count + len(rows) - 1)
+        self._store_page(page_number, rows)
+        self._row_count += len(rows)
+        if notify:
+            self.endInsertRows()
+
+    def _page(self, page_number):
+        rows = self._pages.get(page_number)
+        if rows is None:
+            rows = self._query_range(page_number)
+            self._store_page(page_number, rows)
+            # Пока страница была вытеснена, её строки могли измениться в БД (коммит
+            # другого соединения или ещё не доставленный apply_changes) - длина
+            # страницы в модели выравнивается сразу, иначе сдвинутся номера строк
+            if self._resize_page(page_number, len(rows)):
+                first = self._page_offsets[page_number]
+                if rows:
+                    self.dataChanged.emit(self.index(first, 0),
+                                          self.index(first + len(rows) - 1, len(POST_COLUMNS) - 1))
+        else:
+            self._pages.move_to_end(page_number)
+        return rows
+
+    def _locate(self, row):
+        page_number = bisect_right(self._page_offsets, row) - 1
+        return page_number, row - self._page_offsets[page_number]
+
+    def row(self, row):
+        page_number, offset = self._locate(row)
+        rows = self._page(page_number)
+        # После удалений перечитанная страница может оказаться короче
+        return rows[offset] if offset < len(rows) else None
+
+    # Строки с этими id изменились, появились или удалены: перечитываются только
+    # страницы, куда попадают id, и вид получает точечные сигналы вставки/удаления.
+    # Новые id за концом загруженной части появятся при следующем fetchMore.
+    def apply_changes(self, record_ids):
+        pages = set()
+        beyond = False
+        for record_id in record_ids:
+            if self._last_id is None or record_id > self._last_id:
+                beyond = True
+            else:
+                pages.add(max(0, bisect_right(self._page_starts, record_id) - 1))
+        if len(pages) > self.max_pages:
+            # Изменений слишком много - дешевле сбросить загруженные страницы
+            self.refresh()
+            return
+        for page_number in sorted(pages):
+            self._reload_page(page_number)
+        if beyond and self._exhausted:
+            self._exhausted = False
+            self._fetch_next_page()
+
+    def _reload_page(self, page_number):
+        rows = self._query_range(page_number)
+        first = self._page_offsets[page_number]
+        old = self._pages.get(page_number)
+        if old is None or len(old) != self._page_sizes[page_number]:
+            # Страница вытеснена или кэш не совпадает с длиной в модели - поправляется
+            # длина с конца, содержимое обновит dataChanged ниже
+            self._resize_page(page_number, len(rows))
+        else:
+            new_ids = {record[0] for record in rows}
+            for offset in reversed(range(len(old))):
+                if old[offset][0] not in new_ids:
+                    self.beginRemoveRows(QModelIndex(), first + offset, first + offset)
+                    del old[offset]
+                    self._shift(page_number, -1)
+                    self.endRemoveRows()
+            old_ids = {record[0] for record in old}
+            for offset, record in enumerate(rows):
+                if record[0] not in old_ids:
+                    self.beginInsertRows(QModelIndex(), first + offset, first + offset)
+                    old.insert(offset, record)
+                    self._shift(page_number, 1)
+                    self.endInsertRows()
+        self._store_page(page_number, rows)
+        if rows:
+            self.dataChanged.emit(self.index(first, 0),
+                                  self.index(first + len(rows) - 1, len(POST_COLUMNS) - 1))
+
+    # Длина страницы в модели становится size: строки добавляются или убираются с её
+    # конца. Возвращает изменение длины.
+    def _resize_page(self, page_number, size):
+        delta = size - self._page_sizes[page_number]
+        end = self._page_offsets[page_number] + size
+        if delta < 0:
+            self.beginRemoveRows(QModelIndex(), end, end - delta - 1)
+            self._shift(page_number, delta)
+            self.endRemoveRows()
+        elif delta > 0:
+            self.beginInsertRows(QModelIndex(), end - delta, end - 1)
+            self._shift(page_number, delta)
+            self.endInsertRows()
+        return delta
+
+    def _shift(self, page_number, delta):
+        self._page_sizes[page_number] += delta
+        for later in range(page_number + 1, len(self._page_offsets)):
+            self._page_offsets[later] += delta
+        self._row_count += delta
+
+    def record_id(self, row):
+        record = self.row(row)
+        return record[0] if record is not None else None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(POST_COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not parent.isValid() and not self._exhausted:
+            self._fetch_next_page()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        record = self.row(index.row())
+        if record is None:
+            return None
+        value = record[index.column()]
+        return str(value) if role == Qt.DisplayRole and value is not None else value
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if self.editable and index.isValid() and index.column() > 0:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    # Правка ячейки записывается в БД сразу, а в кэше обновляется только эта строка
+    def setData(self, index, value, role=Qt.EditRole):
+        if not self.editable or role != Qt.EditRole or not index.isValid() or index.column() == 0:
+            return False
+        record = self.row(index.row())
+        if record is None:
+            return False
+        column = POST_COLUMNS[index.column()]
+        with self.manager.writer() as conn:
+            conn.execute(f"UPDATE posts SET {column} = ? WHERE id = ?", (value, record[0]))
+        page_number, offset = self._locate(index.row())
+        updated = list(record)
+        updated[index.column()] = value
+        self._pages[page_number][offset] = tuple(updated)
+        self.dataChanged.emit(index, index, [role])
+        return True
@@ -0,0 +1,101 @@
+import json
+import codecs
+
+import requests
+
+POSTS_URL = "https://jsonplaceholder.typicode.com/posts"
+
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",]"  # что может идти за элементом массива
+
+
+# Готовые фильтры для постов
+def even_user_id(post):
+    return post['userId'] % 2 == 0
+
+
+def user_id_in(user_ids):
+    user_ids = frozenset(user_ids)
+    return lambda post: post['userId'] in user_ids
+
+
+# Потоковый разбор JSON-массива: принимает итератор байтовых кусков и выдаёт
+# элементы по одному. В памяти держится только текущий кусок и недочитанный объект.
+def iter_json_array(chunks):
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    started = False
+    finished = False
+    eof = False
+    chunks = iter(chunks)
+
+    while not finished:
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            buf += utf8.decode(b'', final=True)
+        else:
+            buf += utf8.decode(chunk)
+
+        pos = 0
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos == len(buf):
+                break
+
+            if not started:
+                if buf[pos] != '[':
+                    raise ValueError("Ожидался JSON-массив")
+                started = True
+                pos += 1
+                continue
+            if buf[pos] == ',':
+                pos += 1
+                continue
+            if buf[pos] == ']':
+                finished = True
+                pos += 1
+                break
+
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Объект разрезан границей куска - ждём следующий
+                break
+            if end == len(buf) and not eof:
+                # Число в конце буфера может продолжиться в следующем куске
+                break
+            if end < len(buf) and buf[end] not in _DELIMITERS:
+                # raw_decode берёт самое длинное корректное начало числа: у "2." или
+                # "2.5e" разобрано только "2" / "2.5", остальное придёт следующим куском
+                if eof:
+                    raise ValueError("Некорректный элемент JSON-массива")
+                break
+            pos = end
+            yield item
+
+        buf = buf[pos:]
+        if eof and not finished:
+            raise ValueError("Неожиданный конец JSON-массива")
+
+
+# Фильтрация потока постов произвольным предикатом
+def stream_posts(response, predicate=None, chunk_size=64 * 1024):
+    try:
+        for post in iter_json_array(response.iter_content(chunk_size)):
+            if predicate is None or predicate(post):
+                yield post
+    finally:
+        response.close()
+
+
+# Потоковая загрузка постов: запрос выполняется сразу (ошибки видны в момент вызова),
+# а посты разбираются лениво по мере чтения тела ответа
+def iter_posts(url=POSTS_URL, predicate=None, session=None, chunk_size=64 * 1024):
+    response = (session or requests).get(url, stream=True)
+    if response.status_code != 200:
+        response.close()
+        raise Exception(f"Ошибка при получении данных: {response.status_code}")
+    return stream_posts(response, predicate, chunk_size)
@@ -0,0 +1,114 @@
+import sys
+import time
+import builtins
+
+PROFILE_FLAG = "--profile-startup"
+FIRST_PAINT = "первая отрисовка"
+
+_profile = None
+
+
+# Профиль запуска GUI: время импорта каждого модуля (вместе с вложенными и
+# собственное) и этапы инициализации до первой отрисовки окна. Перехватывает
+# builtins.__import__, поэтому start() нужно вызвать до остальных импортов.
+class StartupProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = []  # (модуль, глубина вложенности, всего, собственное)
+        self.phases = []
+        self._children = [0.0]
+        self._depth = 0
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._children.append(0.0)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - started
+            self._depth -= 1
+            children = self._children.pop()
+            self._children[-1] += elapsed
+            self.imports.append((name, self._depth, elapsed, elapsed - children))
+
+    def stop(self):
+        builtins.__import__ = self._original_import
+
+    def mark(self, label):
+        self.phases.append((label, time.perf_counter() - self.started))
+
+    def report(self, top=15):
+        painted = dict(self.phases).get(FIRST_PAINT, time.perf_counter() - self.started)
+        lines = [f"Запуск до первой отрисовки: {painted * 1000:.1f} мс", "", "Этапы:"]
+        previous = 0.0
+        for label, at in self.phases:
+            lines.append(f"  {label:<32} {at * 1000:9.1f} мс  (+{(at - previous) * 1000:.1f})")
+            previous = at
+
+        imports_total = sum(elapsed for _, depth, elapsed, _ in self.imports if depth == 0)
+        lines += ["", f"Импорты верхнего уровня: {imports_total * 1000:.1f} мс"]
+        roots = sorted((item for item in self.imports if item[1] == 0), key=lambda item: -item[2])
+        for name, _, elapsed, own in roots[:top]:
+            lines.append(f"  {name:<40} {elapsed * 1000:9.1f} мс  (собственное {own * 1000:.1f})")
+
+        lines += ["", "Самые долгие модули (собственное время):"]
+        for name, _, elapsed, own in sorted(self.imports, key=lambda item: -item[3])[:top]:
+            lines.append(f"  {name:<40} {own * 1000:9.1f} мс")
+        return "\n".join(lines)
+
+
+# Включает профиль, если в командной строке есть --profile-startup
+def start(argv=None):
+    global _profile
+    argv = sys.argv if argv is None else argv
+    if PROFILE_FLAG in argv and _profile is None:
+        _profile = StartupProfile()
+    return _profile
+
+
+def mark(label):
+    if _profile is not None:
+        _profile.mark(label)
+
+
+# callback вызывается один раз - сразу после первой отрисовки widget
+def after_first_paint(widget, callback):
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+
+    class FirstPaintFilter(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                widget.removeEventFilter(self)
+                QTimer.singleShot(0, callback)
+            return False
+
+    widget.installEventFilter(FirstPaintFilter(widget))
+
+
+# При включённом профиле: после первой отрисовки (и отложенной инициализации,
+# запланированной до этого вызова) печатает отчёт и завершает приложение. Окно
+# закрывается обычным путём, чтобы closeEvent остановил рабочие потоки до выхода
+def report_after_first_paint(widget, app):
+    if _profile is None:
+        return
+
+    from PyQt5.QtCore import QTimer
+
+    def finish():
+        mark("отложенная инициализация")
+        _profile.stop()
+        print(_profile.report())
+        widget.close()
+        app.quit()
+
+    def painted():
+        mark(FIRST_PAINT)
+        # Ещё один проход цикла событий, чтобы отложенная инициализация успела выполниться
+        QTimer.singleShot(0, finish)
+
+    after_first_paint(widget, painted)
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from charts import LineChart
+
+
+def line_data(rows):
+    return pd.DataFrame({
+        'Date': pd.date_range('2024-01-01', periods=rows, freq='D'),
+        'Value1': np.sin(np.arange(rows) / 10.0),
+    })
+
+
+def test_line_has_points_after_build():
+    chart = LineChart(FigureCanvasAgg(Figure()), line_data(1000))
+    assert len(chart.line.get_xdata()) > 0
+
+
+def test_line_follows_appended_rows():
+    chart = LineChart(FigureCanvasAgg(Figure()), line_data(10))
+    data = line_data(20)
+    chart.append(data, data.iloc[10:])
+    assert max(chart.line.get_xdata()) == 19
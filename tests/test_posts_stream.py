@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from posts_stream import iter_json_array
+
+DOCUMENT = '[{"id": 1, "title": "a"}, 2.5, -17, 2.5e10, 1E-3, true, null, "x"]'
+
+
+def split_at(text, *positions):
+    data = text.encode('utf-8')
+    bounds = (0,) + positions + (len(data),)
+    return [data[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+
+@pytest.mark.parametrize('position', range(1, len(DOCUMENT)))
+def test_split_anywhere(position):
+    assert list(iter_json_array(split_at(DOCUMENT, position))) == json.loads(DOCUMENT)
+
+
+@pytest.mark.parametrize('chunks', [
+    [b'[2.', b'5]'],
+    [b'[2.5e', b'10]'],
+    [b'[1, 2', b'3, 4]'],
+    [b'[-', b'5]'],
+])
+def test_number_split_across_chunks(chunks):
+    assert list(iter_json_array(chunks)) == json.loads(b''.join(chunks))
+
+
+def test_truncated_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'[1, 2']))
@@ -0,0 +1,34 @@
+import pytest
+
+from title_index import TitleIndex
+
+ROWS = [(1, "Hello world"), (2, "Qui est esse"), (3, "HELP me"), (4, None), (5, "eh")]
+
+
+def expected(rows, text):
+    return sorted(record_id for record_id, title in rows if text.lower() in (title or "").lower())
+
+
+@pytest.mark.parametrize('text', ['h', 'He', 'el', 'hel', 'help', 'esse', 'xyz', ' '])
+def test_search_matches_scan(text):
+    assert TitleIndex(ROWS).search(text) == expected(ROWS, text)
+
+
+def test_empty_query_does_not_filter():
+    assert TitleIndex(ROWS).search('') is None
+
+
+def test_two_character_query():
+    index = TitleIndex(ROWS)
+    assert index.search('he') == [1, 3]
+    index.remove(3)
+    index.upsert(2, "the end")
+    assert index.search('he') == [1, 2]
+
+
+def test_refine_from_short_query():
+    index = TitleIndex(ROWS)
+    assert index.search('h') == [1, 3, 5]
+    assert index.search('he') == [1, 3]
+    assert index.stats["refined"] == 1
+    assert index.stats["candidates"] == len(ROWS) + 3
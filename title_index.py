@@ -0,0 +1,106 @@
+from array import array
+
+MIN_QUERY_LENGTH = 3
+
+
+def _grams(title):
+    return {title[i:i + 3] for i in range(len(title) - 2)}
+
+
+# Колоночное хранилище заголовков постов в памяти с триграммным индексом для
+# поиска подстроки. Колонки: ids (array 'q'), заголовки в нижнем регистре (list)
+# и признак живой строки (bytearray); индекс - словарь триграмма -> array позиций.
+# Запрос проверяет только позиции самой редкой своей триграммы, а уточнение
+# предыдущего запроса (новый запрос содержит старый) - только прошлый результат.
+# Для запросов короче MIN_QUERY_LENGTH символов триграмм нет - они проверяют все
+# заголовки подряд (или прошлый результат, если уточняют его).
+class TitleIndex:
+    def __init__(self, rows=()):
+        self.stats = {"queries": 0, "refined": 0, "candidates": 0, "rebuilds": 0}
+        self._reset(rows)
+
+    def _reset(self, rows):
+        self.ids = array('q')
+        self.titles = []
+        self.alive = bytearray()
+        self.grams = {}
+        self.positions = {}  # id -> позиция в колонках
+        self.dead = 0
+        self._last = None  # (запрос, позиции результата) для уточнения
+        for record_id, title in rows:
+            self._append(record_id, title)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def _append(self, record_id, title):
+        position = len(self.ids)
+        title = (title or "").lower()
+        self.ids.append(record_id)
+        self.titles.append(title)
+        self.alive.append(1)
+        self.positions[record_id] = position
+        grams = self.grams
+        for gram in _grams(title):
+            postings = grams.get(gram)
+            if postings is None:
+                postings = grams[gram] = array('I')
+            postings.append(position)
+
+    # Изменённый заголовок дописывается в конец, старая позиция помечается мёртвой
+    def upsert(self, record_id, title):
+        position = self.positions.get(record_id)
+        if position is not None:
+            if self.titles[position] == (title or "").lower():
+                return
+            self.alive[position] = 0
+            self.dead += 1
+        self._append(record_id, title)
+        self._changed()
+
+    def remove(self, record_id):
+        position = self.positions.pop(record_id, None)
+        if position is not None:
+            self.alive[position] = 0
+            self.dead += 1
+            self._changed()
+
+    def _changed(self):
+        self._last = None
+        # Мёртвые позиции только замедляют запросы; когда их больше половины, колонки
+        # и индекс собираются заново
+        if self.dead > len(self.positions):
+            live = [(self.ids[p], self.titles[p]) for p in range(len(self.ids)) if self.alive[p]]
+            self.stats["rebuilds"] += 1
+            self._reset(live)
+
+    # Возвращает отсортированный список id постов, в заголовке которых есть text
+    # (без учёта регистра); None для пустого запроса (фильтра нет)
+    def search(self, text):
+        query = text.lower()
+        if not query:
+            return None
+        self.stats["queries"] += 1
+        titles = self.titles
+        alive = self.alive
+
+        if len(query) < MIN_QUERY_LENGTH:
+            candidates = range(len(titles))
+        else:
+            candidates = None
+            for i in range(len(query) - 2):
+                postings = self.grams.get(query[i:i + 3])
+                if postings is None:
+                    candidates = ()
+                    break
+                if candidates is None or len(postings) < len(candidates):
+                    candidates = postings
+        if self._last is not None and self._last[0] in query and len(self._last[1]) <= len(candidates):
+            self.stats["refined"] += 1
+            candidates = self._last[1]
+
+        self.stats["candidates"] += len(candidates)
+        matched = [p for p in candidates if alive[p] and query in titles[p]]
+        self._last = (query, matched)
+        ids = self.ids
+        return sorted(ids[p] for p in matched)